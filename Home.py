@@ -3,7 +3,7 @@ import streamlit as st
 
 # --- Page Config (Global) ---
 # This must be the first Streamlit command
-from utils import auth
+from utils import auth, single_flight, cache_warmup, refresh_scheduler, cache_namespaces
 
 # --- Page Config (Global) ---
 # This must be the first Streamlit command
@@ -14,6 +14,11 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Background warm-up of all tenant datasets (once per server process, non-blocking).
+# Every page calls this before its login gate, so the first script run of the process
+# starts it; the loaders are imported inside the worker thread, not on the login path.
+cache_warmup.start()
+
 # Force reload signal
 st.toast("👋 환영합니다! (Welcome)", icon="✨")
 
@@ -138,3 +143,19 @@ if role in ['gangwon', 'admin']:
             st.switch_page("pages/3_Gangwon_FC.py")
 
 st.sidebar.success(f"로그인 계정: {st.session_state.get('current_user', 'Unknown')} ({role})")
+
+# --- Cache metrics (admin only) ---
+if role == 'admin':
+    from utils import player_cache  # pulls in pandas; not needed on the login path
+    with st.sidebar.expander("캐시 상태 (Cache)"):
+        warm = cache_warmup.progress()
+        st.progress(warm["finished"] / warm["total"], text=f"Warm-up {warm['finished']}/{warm['total']}")
+        for task, status in warm["tasks"].items():
+            st.caption(f"{task}: {status['state']}" + (f" ({status['seconds']}s)" if status['seconds'] is not None else ""))
+        st.caption(f"중복 조회 방지 (coalesced fetches): {single_flight.duplicates_avoided()}")
+        st.json(single_flight.stats())
+        st.json(refresh_scheduler.status())
+        st.json(player_cache.stats())
+        ns = st.selectbox("Namespace", list(cache_namespaces.NAMESPACE_VERSIONS), key="cache_ns")
+        if st.button("이 데이터셋만 새로고침 (Invalidate)", key="cache_ns_bump"):
+            cache_namespaces.bump(ns)
@@ -2,6 +2,7 @@ from google.cloud import bigquery
 from google.oauth2 import service_account
 import streamlit as st
 import os
+from utils import schema_cache
 
 # Manual setup to avoid loader complexity
 KEY_FILE = "gangwon-key.json"
@@ -10,9 +11,9 @@ for path in [KEY_FILE, os.path.join("gangwon_fc", KEY_FILE)]:
         creds = service_account.Credentials.from_service_account_file(path)
         client = bigquery.Client(credentials=creds, project="gangwonfc")
         
-        query = "SELECT * FROM `gangwonfc.vald_data.vald_all_data` LIMIT 1"
-        df = client.query(query).to_dataframe()
+        # Table metadata only (cached in .cache/schemas.json), no query job
+        info = schema_cache.get_table_info(client, "gangwonfc.vald_data.vald_all_data")
         
         print("COLUMNS FOUND:")
-        print(df.columns.tolist())
+        print(info['columns'])
         break
@@ -6,7 +6,14 @@ import datetime
 import plotly.express as px
 import plotly.graph_objects as go
 import base64
-from utils import gangwon_data_loader as data_loader
+import os
+import sys
+
+# The loader imports shared modules from the repo-root `utils` package (and
+# gangwon_fc.utils), so put the repo root first on the path: this also works when
+# launched as `streamlit run gangwon_fc/Gangwon_Home.py` or from inside gangwon_fc/.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gangwon_fc.utils import gangwon_data_loader as data_loader
 
 # --- Page Config ---
 st.set_page_config(layout="wide", page_title="Gangwon FC Dashboard", page_icon="⚽")
@@ -164,13 +171,18 @@ if view_mode == "Dashboard (Player & Team)":
             
             # Tab 1: Profile (Radar + Key Stats)
             with tab1:
-                if 'CMJ' in p_data and not p_data['CMJ'].empty:
-                    latest_cmj = p_data['CMJ'].iloc[-1]
-                    
-                    # Radar Chart Logic (Mocked Categories for visual)
-                    categories = ['Power', 'Strength', 'Speed', 'Agility', 'Endurance']
-                    # Normally we'd calculate these percentile ranks
-                    r_values = [80, 70, 60, 85, 90] 
+                # Percentile ranks from the team store (sorted arrays, rebuilt per data version)
+                p_index = data_loader.get_percentile_index()
+                profile = {}
+                if p_index is not None:
+                    group_names = {"squad": "Squad", "position": "Position", "age_band": "Age Band"}
+                    ref_group = st.radio("Reference Group", p_index.available_groups(), horizontal=True,
+                                         format_func=lambda g: group_names.get(g, g))
+                    profile = {k: v for k, v in p_index.profile(selected_player, ref_group).items() if pd.notna(v)}
+
+                if profile:
+                    categories = list(profile.keys())
+                    r_values = [round(v, 1) for v in profile.values()]
                     
                     fig = go.Figure()
                     fig.add_trace(go.Scatterpolar(
@@ -191,9 +203,10 @@ if view_mode == "Dashboard (Player & Team)":
                         st.plotly_chart(fig, use_container_width=True)
                     with c2:
                         st.markdown("### Latest Metrics")
-                        st.dataframe(latest_cmj.to_frame().T, use_container_width=True)
+                        if not p_data.empty:
+                            st.dataframe(p_data.iloc[[-1]], use_container_width=True, hide_index=True)
                 else:
-                    st.info("No CMJ Data available for profile.")
+                    st.info("No test data available for profile.")
             
             # Tab 2: Trends
             with tab2:
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# Incremental per-player baselines for the Gangwon readiness (z-score) views.
+# For every player and metric the running count / mean / M2 (sum of squared
+# deviations) are kept, Welford-style; a batch of new tests is folded in with the
+# parallel (Chan et al.) update, vectorized over players x metrics. The latest
+# value per player and metric is tracked alongside, so the squad-wide z-score
+# table is precomputed with the store instead of re-aggregated on every rerun.
+#   table = BaselineTable.build(team_df, metrics)
+#   table = table.updated(new_team_df)   # folds in only the tests after the watermark
+#   table.z                              # DataFrame: players x metrics
+# Rows without a Test_Date cannot be ordered and are left out of the baselines.
+
+
+def _fingerprint(df, columns):
+    """Order-independent hash of the given rows (uint64 sum of row hashes, so it is additive)."""
+    if df.empty:
+        return 0
+    return int(pd.util.hash_pandas_object(df[columns], index=False).to_numpy(dtype=np.uint64).sum())
+
+
+class BaselineTable:
+    """Running stats per (player, metric) up to `watermark` (the last Test_Date folded in)."""
+
+    def __init__(self, metrics):
+        self.metrics = list(metrics)
+        empty = pd.DataFrame(columns=self.metrics, dtype=float)
+        self.n = empty
+        self.mean = empty
+        self.m2 = empty
+        self.latest = empty
+        self.latest_date = pd.Series(dtype='datetime64[ns]')
+        self.watermark = None
+        self.fingerprint = 0
+        self.z = empty
+
+    @classmethod
+    def build(cls, df, metrics):
+        """Baselines from every dated row of `df`."""
+        metrics = [m for m in metrics if m in df.columns]
+        table = cls(metrics)
+        return table._fold(table._dated(df))
+
+    def updated(self, df):
+        """
+        Baselines for a newer version of the team frame. If the rows up to the watermark
+        are unchanged (same fingerprint), only the tests after it are folded in;
+        otherwise (edited / deleted rows, new columns) the table is rebuilt.
+        """
+        metrics = [m for m in self.metrics if m in df.columns]
+        dated = self._dated(df)
+        if self.watermark is None or metrics != self.metrics:
+            return BaselineTable.build(df, self.metrics)
+        known = dated[dated['Test_Date'] <= self.watermark]
+        if _fingerprint(known, self._key_columns()) != self.fingerprint:
+            return BaselineTable.build(df, self.metrics)
+        new_rows = dated[dated['Test_Date'] > self.watermark]
+        if new_rows.empty:
+            return self
+        return self._copy()._fold(new_rows)
+
+    def zscores(self, latest=None):
+        """(latest - mean) / std per player and metric; `latest` defaults to each player's latest value."""
+        latest = self.latest if latest is None else latest.reindex(columns=self.metrics)
+        n = self.n.reindex(latest.index)
+        std = np.sqrt(self.m2.reindex(latest.index) / (n - 1)).where(n > 1)
+        z = (latest - self.mean.reindex(latest.index)) / std
+        return z.replace([np.inf, -np.inf], np.nan)
+
+    def _key_columns(self):
+        return ['Name', 'Test_Date'] + self.metrics
+
+    @staticmethod
+    def _dated(df):
+        if df.empty or 'Name' not in df.columns or 'Test_Date' not in df.columns:
+            return pd.DataFrame(columns=['Name', 'Test_Date'])
+        return df[df['Test_Date'].notna() & df['Name'].notna()]
+
+    def _copy(self):
+        table = BaselineTable(self.metrics)
+        table.__dict__.update(self.__dict__)
+        return table
+
+    def _fold(self, batch):
+        """Merges the stats of `batch` (dated rows) into this table (parallel Welford update)."""
+        if batch.empty:
+            return self
+
+        values = batch[['Name'] + self.metrics].copy()
+        for m in self.metrics:
+            values[m] = pd.to_numeric(values[m], errors='coerce').astype(float)
+        group = values.groupby('Name', sort=True)
+        b_n = group.count()
+        b_mean = group.mean()
+        b_m2 = group.var(ddof=0) * b_n
+
+        players = self.n.index.union(b_n.index)
+        a_n = self.n.reindex(players).fillna(0)
+        a_mean = self.mean.reindex(players).fillna(0)
+        a_m2 = self.m2.reindex(players).fillna(0)
+        b_n = b_n.reindex(players).fillna(0)
+        b_mean = b_mean.reindex(players).fillna(0)
+        b_m2 = b_m2.reindex(players).fillna(0)
+
+        n = a_n + b_n
+        safe_n = n.where(n > 0)
+        delta = (b_mean - a_mean).where(b_n > 0, 0.0)
+        self.n = n
+        self.mean = (a_mean + delta * b_n / safe_n).where(n > 0)
+        self.m2 = (a_m2 + b_m2 + delta ** 2 * a_n * b_n / safe_n).where(n > 0)
+
+        # Batch rows are in Test_Date order: last() is each player's latest non-null value
+        self.latest = group.last().reindex(players).combine_first(self.latest.reindex(players))
+        batch_dates = batch.groupby('Name', sort=True)['Test_Date'].max()
+        self.latest_date = batch_dates.combine_first(self.latest_date).reindex(players)
+
+        self.fingerprint = (self.fingerprint + _fingerprint(batch, self._key_columns())) % 2 ** 64
+        self.watermark = batch['Test_Date'].max() if self.watermark is None else max(self.watermark, batch['Test_Date'].max())
+        self.z = self.zscores()
+        return self
@@ -0,0 +1,70 @@
+import warnings
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# Declarative registry of the derived Gangwon metrics.
+# Each metric lists its input alternatives in order of preference; the first
+# alternative whose columns are all present is combined (row-wise, NaN skipped)
+# into the derived column. All metrics are computed in one vectorized pass when
+# the team store is built, i.e. once per data version.
+# Adding a metric = adding a DerivedMetric below; the dashboard reads the column.
+#   sources: ((col, col, ...), (fallback col, ...), ...)
+#   combine: "mean" (add an entry to _COMBINE for other row-wise reductions)
+
+DerivedMetric = namedtuple("DerivedMetric", ["name", "sources", "combine"])
+
+DERIVED_METRICS = [
+    # SLJ: L/R average, else the single-leg column
+    DerivedMetric("SLJ_Avg", (("SLJ_Height_L", "SLJ_Height_R"), ("SLJ_Height_Imp_mom_",)), "mean"),
+    DerivedMetric("Hamstring_Ecc_Avg", (("Hamstring_Ecc_L", "Hamstring_Ecc_R"),), "mean"),
+    DerivedMetric("Hamstring_ISO_Avg", (("Hamstring_ISO_L", "Hamstring_ISO_R"),), "mean"),
+    DerivedMetric("HipAdd_Avg", (("HipAdd_L", "HipAdd_R"),), "mean"),
+    DerivedMetric("HipAbd_Avg", (("HipAbd_L", "HipAbd_R"),), "mean"),
+]
+
+_COMBINE = {
+    "mean": lambda values: np.nanmean(values, axis=1),
+}
+
+
+def resolve_inputs(metric, columns):
+    """First source alternative of a metric available in `columns` (None if none is)."""
+    for inputs in metric.sources:
+        if all(col in columns for col in inputs):
+            return inputs
+    return None
+
+
+def compute(df, metrics=None):
+    """
+    Derived columns for `df` as a DataFrame on the same index (one column per metric
+    whose inputs are available). Columns already present in `df` are not recomputed.
+    """
+    columns = set(df.columns)
+    derived = {}
+    for metric in (DERIVED_METRICS if metrics is None else metrics):
+        if metric.name in columns or metric.name in derived:
+            continue
+        inputs = resolve_inputs(metric, columns)
+        if inputs is None:
+            continue
+        values = np.column_stack([
+            pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan) for col in inputs
+        ]) if len(df) else np.empty((0, len(inputs)))
+        if len(inputs) == 1:
+            derived[metric.name] = values[:, 0]
+        else:
+            with warnings.catch_warnings():
+                # all-NaN rows give NaN ("Mean of empty slice")
+                warnings.simplefilter("ignore", category=RuntimeWarning)
+                derived[metric.name] = _COMBINE[metric.combine](values)
+    return pd.DataFrame(derived, index=df.index)
+
+
+def add_to(df, metrics=None):
+    """`df` with its derived columns appended (single concat, no per-column inserts)."""
+    derived = compute(df, metrics)
+    if not len(derived.columns):
+        return df
+    return pd.concat([df, derived], axis=1)
@@ -3,16 +3,17 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import datetime
-import re
-from google.cloud import bigquery
-from google.oauth2 import service_account
-import os
+from utils import bq_clients, data_version, single_flight, refresh_scheduler, player_cache, disk_cache, cache_namespaces, query_builder
+from gangwon_fc.utils import range_aggregates, derived_metrics, percentile_ranks, baselines
 
 # --- Configuration ---
-# Update this to the actual key file for Gangwon FC if available
-SERVICE_ACCOUNT_FILE = "gangwon-key.json" 
 PROJECT_ID = "gangwonfc"
 DATASET_ID = "vald_data"
+TEAM_TABLE = f"{PROJECT_ID}.{DATASET_ID}.vald_all_data"
+
+# Byte budget for cached per-player frames (see utils.player_cache)
+PLAYER_CACHE_BYTES = 64 * 1024 * 1024
+_player_cache = player_cache.PlayerLRU("gangwon", PLAYER_CACHE_BYTES)
 
 # --- Mock Data Generator (For Demo/Dev) ---
 def generate_mock_data(player_name, test_type):
@@ -46,162 +47,218 @@ def generate_mock_data(player_name, test_type):
     return pd.DataFrame(data)
 
 def get_db_client():
-    """Attempts to create a BigQuery client. Returns None if credentials missing."""
-    credentials = None
-    
-    # Define Scopes
-    scopes = [
-        "https://www.googleapis.com/auth/cloud-platform",
-        "https://www.googleapis.com/auth/drive",
-        "https://www.googleapis.com/auth/spreadsheets"
-    ]
-    
-    # 1. Try Secrets (Cloud Deployment)
-    # Check for standard 'gcp_service_account' or custom 'gangwon_service_account'
-    if "gcp_service_account" in st.secrets:
-        try:
-            # Create credentials from the secrets dictionary
-            # st.secrets returns a AttrDict, we might need to convert to dict
-            key_info = dict(st.secrets["gcp_service_account"])
-            credentials = service_account.Credentials.from_service_account_info(
-                key_info, scopes=scopes
-            )
-            # print("Loaded credentials from Streamlit Secrets (gcp_service_account)")
-        except Exception as e:
-            print(f"Failed to load secrets: {e}")
-
-    elif "gangwon_service_account" in st.secrets:
-         try:
-            key_info = dict(st.secrets["gangwon_service_account"])
-            credentials = service_account.Credentials.from_service_account_info(
-                key_info, scopes=scopes
-            )
-         except Exception: pass
-            
-    # 2. Try File (Local Development)
-    if not credentials:
-        possible_paths = [SERVICE_ACCOUNT_FILE, os.path.join("gangwon_fc", SERVICE_ACCOUNT_FILE)]
-        for path in possible_paths:
-            if os.path.exists(path):
-                try:
-                    credentials = service_account.Credentials.from_service_account_file(path, scopes=scopes)
-                    print(f"Loaded credentials from: {path}") 
-                    break
-                except Exception as e:
-                    print(f"Failed to load {path}: {e}")
-                    pass
-        
-    if credentials:
-        return bigquery.Client(credentials=credentials, project=PROJECT_ID)
-    else:
+    """Shared Gangwon client (built once per process, see utils.bq_clients). Returns None if credentials missing."""
+    try:
+        return bq_clients.get_client("gangwon")
+    except Exception as e:
+        print(f"Gangwon client unavailable: {e}")
         return None
 
-@st.cache_data(ttl=600)
-def get_player_list():
-    """Fetch unique player list from vald_all_data table."""
-    client = get_db_client()
-    
-    if client:
+# Numeric columns coerced once when the team frame is loaded (team + player views)
+NUMERIC_CANDIDATES = [
+    'CMJ_Height_Imp_mom', 'CMJ_Height_Imp_mom_', 'CMJ_RSI_mod_Imp_mom',
+    'SquatJ_Height_Imp_mom', 'SquatJ_Height_Imp_mom_',
+    'SLJ_Height_L', 'SLJ_Height_R', 'SLJ_Height_Imp_mom_',
+    'SLJ_Height_L_Imp_mom_', 'SLJ_Height_R_Imp_mom_',
+    'Hamstring_Ecc_L', 'Hamstring_Ecc_R', 'Hamstring_Ecc_Imbalance',
+    'Hamstring_ISO_L', 'Hamstring_ISO_R',
+    'HipAdd_L', 'HipAdd_R', 'HipAdd_Imbalance',
+    'HipAbd_L', 'HipAbd_R'
+]
+
+def normalize_columns(df):
+    """Column names -> identifiers, Test_Date from Date, numeric candidates coerced (NaN on errors)."""
+    df.columns = [c.replace(' ', '_').replace(':', '_').replace('(', '_').replace(')', '').replace('-', '_') for c in df.columns]
+
+    # Standardize Date (datetime64, day precision)
+    if 'Date' in df.columns:
+        df['Test_Date'] = pd.to_datetime(df['Date'], errors='coerce').dt.normalize()
+
+    for col in NUMERIC_CANDIDATES:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+def index_by_date(df):
+    """
+    Sorts the frame by Test_Date (stable, NaT last) and indexes it by date, so date
+    ranges can be cut with a binary search (see date_range_view).
+    """
+    if 'Test_Date' not in df.columns:
+        return df
+    if not pd.api.types.is_datetime64_any_dtype(df['Test_Date']):
+        df['Test_Date'] = pd.to_datetime(df['Test_Date'], errors='coerce')
+    df = df.sort_values('Test_Date', kind='stable', na_position='last')
+    # Unnamed, so 'Test_Date' stays unambiguous as a column for groupby/sort_values
+    df.index = pd.DatetimeIndex(df['Test_Date'].values)
+    return df
+
+def date_range_view(df, start_date, end_date):
+    """
+    Rows with start_date <= Test_Date <= end_date (whole days) of a frame sorted by
+    Test_Date (index_by_date / player slices). Two binary searches + a positional
+    slice: cost scales with the result, and no rows are copied.
+    """
+    if df.empty or 'Test_Date' not in df.columns:
+        return df
+    dates = df['Test_Date'].values
+    n_valid = len(dates) - int(np.isnat(dates).sum())  # NaT rows are sorted last
+    lo = np.searchsorted(dates[:n_valid], np.datetime64(pd.Timestamp(start_date)), side='left')
+    hi = np.searchsorted(dates[:n_valid], np.datetime64(pd.Timestamp(end_date) + pd.Timedelta(days=1)), side='left')
+    return df.iloc[lo:hi]
+
+def get_data_version():
+    """
+    Source version of vald_all_data (rate-limited probe, see utils.data_version),
+    in the 'gangwon' cache namespace (see utils.cache_namespaces).
+    """
+    return cache_namespaces.key("gangwon", data_version.current_version("gangwon", TEAM_TABLE))
+
+def get_team_store():
+    """
+    Team store, served stale-while-revalidate (utils.refresh_scheduler): the last good
+    store is returned immediately and rebuilt in the background when vald_all_data changed.
+    If the first load fails, an empty store carrying the error message is returned; the
+    failure is remembered for refresh_scheduler.FAILURE_COOLDOWN seconds, so repeated calls
+    within a rerun do not re-run the vald_all_data query.
+    """
+    try:
+        return refresh_scheduler.get("gangwon")
+    except Exception as e:
+        return {"df": pd.DataFrame(), "players": {}, "roster": [], "aggregates": None,
+                "percentiles": None, "baselines": None, "version": None, "error": str(e)}
+
+@single_flight.coalesce
+@st.cache_resource(max_entries=2)
+def _build_team_store(version=None):
+    """
+    In-memory store built from ONE query of vald_all_data:
+        {"df": normalized team frame + derived metrics, sorted and indexed by Test_Date (datetime64),
+         "players": {name: row positions in Date ASC order},
+         "roster": sorted player names,
+         "aggregates": range_aggregates.RangeAggregates (prefix sums for date-range means),
+         "percentiles": percentile_ranks.PercentileIndex (radar percentile ranks),
+         "baselines": baselines.BaselineTable (per-player running stats + z-scores; set by _refresh_team_store),
+         "version": source version it was built from,
+         "error": None}
+    Shared across sessions - treat the frame and the views handed out as read-only.
+    Raises RuntimeError if the DB is unreachable (failed builds are not cached).
+    The normalized frame is persisted per version (utils.disk_cache), so after a restart
+    the store is rebuilt from disk without querying vald_all_data again.
+    """
+    store = {"df": pd.DataFrame(), "players": {}, "roster": [], "aggregates": None,
+             "percentiles": None, "baselines": None, "version": version, "error": None}
+    frames, _ = disk_cache.load_frames("gangwon_team", version)
+    if frames is not None:
+        df = frames["team"]
+    else:
+        client = get_db_client()
+        if not client:
+            raise RuntimeError("DB Connection Failed")
+
         try:
-            # Query the single table "vald_all_data"
-            # Note: Column name "Name" should exist based on inspection
-            query = f"SELECT DISTINCT Name FROM `{PROJECT_ID}.{DATASET_ID}.vald_all_data` ORDER BY Name"
-            df = client.query(query).to_dataframe()
-            players = df['Name'].tolist()
-            if not players:
-                return ["No Players Found in DB"]
-            return players
+            df = query_builder.run(client, TEAM_TABLE, order_by=[("Date", "ASC")])
         except Exception as e:
-            print(f"DB Connection Error: {e}")
-            return [f"DB Error: {e}"]
-            
-    return ["DB Connection Failed"]
+            print(f"Team Data Query Failed: {e}")
+            raise RuntimeError(f"DB Error: {e}")
+
+        if df.empty:
+            return store
+
+        df = normalize_columns(df)
+        disk_cache.save_frames("gangwon_team", version, {"team": df})
+
+    # Derived metrics (utils.derived_metrics registry), computed once per version
+    df = derived_metrics.add_to(index_by_date(df))
+    store["df"] = df
+
+    if 'Name' in df.columns:
+        # Per-player slice index; positions ascend, so each slice is in Test_Date order
+        groups = df.groupby('Name', sort=True).indices
+        store["players"] = groups
+        store["roster"] = list(groups.keys())
+    store["aggregates"] = range_aggregates.RangeAggregates(df, groups=store["players"])
+    store["percentiles"] = percentile_ranks.PercentileIndex(df)
+    return store
+
+def baseline_metrics(df):
+    """Metrics tracked by the readiness baselines: numeric VALD columns + derived metrics."""
+    derived = [m.name for m in derived_metrics.DERIVED_METRICS]
+    return [c for c in NUMERIC_CANDIDATES + derived if c in df.columns]
+
+def _refresh_team_store(version, previous):
+    """
+    Scheduler build: team store for `version`. Its baselines are carried forward from the
+    previous store, folding in only the tests that arrived since (see utils.baselines).
+    """
+    store = _build_team_store(version)
+    if store["baselines"] is None and not store["df"].empty:
+        df = store["df"]
+        metrics = baseline_metrics(df)
+        prior = previous.get("baselines") if previous else None
+        if prior is not None and prior.metrics == metrics:
+            store["baselines"] = prior.updated(df)
+        else:
+            store["baselines"] = baselines.BaselineTable.build(df, metrics)
+    return store
+
+refresh_scheduler.register(
+    "gangwon",
+    build=_refresh_team_store,
+    version=get_data_version,
+)
+
+def get_player_list():
+    """Unique player names (from the in-memory team store, no extra query)."""
+    store = get_team_store()
+    if store["error"]:
+        return [store["error"]]
+    if not store["roster"]:
+        return ["No Players Found in DB"]
+    return list(store["roster"])
 
-@st.cache_data(ttl=600)
 def get_full_team_data():
     """
     Fetch ALL data for Team Dashboard aggregation.
-    Returns the raw DataFrame with normalized columns.
+    Returns the raw DataFrame with normalized columns (a copy; see get_team_frame).
     """
-    client = get_db_client()
-    if client:
-        try:
-            query = f"SELECT * FROM `{PROJECT_ID}.{DATASET_ID}.vald_all_data` ORDER BY Date DESC"
-            df = client.query(query).to_dataframe()
-            
-            if not df.empty:
-                # Normalize Columns
-                df.columns = [c.replace(' ', '_').replace(':', '_').replace('(', '_').replace(')', '').replace('-', '_') for c in df.columns]
-                
-                # Standardize Date
-                if 'Date' in df.columns:
-                    df['Test_Date'] = pd.to_datetime(df['Date']).dt.date
-                
-                # Ensure derived numeric columns exist (coerce errors to NaN)
-                numeric_candidates = [
-                    'CMJ_Height_Imp_mom', 'CMJ_Height_Imp_mom_', 
-                    'SquatJ_Height_Imp_mom', 'SquatJ_Height_Imp_mom_',
-                    'SLJ_Height_L', 'SLJ_Height_R', 'SLJ_Height_Imp_mom_', 
-                    'SLJ_Height_L_Imp_mom_', 'SLJ_Height_R_Imp_mom_',
-                    'Hamstring_Ecc_L', 'Hamstring_Ecc_R',
-                    'Hamstring_ISO_L', 'Hamstring_ISO_R',
-                    'HipAdd_L', 'HipAdd_R',
-                    'HipAbd_L', 'HipAbd_R'
-                ]
-                
-                for col in numeric_candidates:
-                    if col in df.columns:
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-                
-                return df
-                
-        except Exception as e:
-            print(f"Team Data Query Failed: {e}")
-            pass
-            
-    return pd.DataFrame()
+    return get_team_store()["df"].copy()
+
+def get_team_frame():
+    """Shared team frame (sorted/indexed by Test_Date) without copying - read-only."""
+    return get_team_store()["df"]
+
+def get_team_range(start_date, end_date):
+    """Read-only view of the team frame between two dates (binary search, no copy)."""
+    return date_range_view(get_team_frame(), start_date, end_date)
+
+def get_range_aggregates():
+    """Prefix-sum aggregates of the current team store (None if the store failed to load)."""
+    return get_team_store()["aggregates"]
+
+def get_percentile_index():
+    """Percentile ranks of the current team store (None if the store failed to load)."""
+    return get_team_store()["percentiles"]
+
+def get_baselines():
+    """Per-player baselines / z-score table of the current team store (None if unavailable)."""
+    return get_team_store()["baselines"]
 
-@st.cache_data(ttl=600)
 def load_player_data(player_name):
     """
-    Load all test data for a player.
-    Similar to get_full_team_data but filtered for a specific player.
+    Load all test data for a player (Date ASC).
+    Sliced from the in-memory team store - no query, no re-normalization. Slices are kept
+    in a byte-budgeted LRU per store version; treat the returned frame as read-only.
     """
-    client = get_db_client()
-    
-    if client:
-        try:
-            query = f"SELECT * FROM `{PROJECT_ID}.{DATASET_ID}.vald_all_data` WHERE Name = '{player_name}' ORDER BY Date"
-            df = client.query(query).to_dataframe()
-            
-            if not df.empty:
-                # Normalize Columns
-                df.columns = [c.replace(' ', '_').replace(':', '_').replace('(', '_').replace(')', '').replace('-', '_') for c in df.columns]
-                
-                if 'Date' in df.columns:
-                    df['Test_Date'] = pd.to_datetime(df['Date']).dt.date
-                
-                # Ensure numerics
-                numeric_candidates = [
-                    'CMJ_Height_Imp_mom', 'CMJ_RSI_mod_Imp_mom', 'SquatJ_Height_Imp_mom', 
-                    'SLJ_Height_L', 'SLJ_Height_R',
-                    'Hamstring_Ecc_L', 'Hamstring_Ecc_R', 'Hamstring_Ecc_Imbalance',
-                    'Hamstring_ISO_L', 'Hamstring_ISO_R',
-                    'HipAdd_L', 'HipAdd_R', 'HipAdd_Imbalance',
-                    'HipAbd_L', 'HipAbd_R'
-                ]
-                for col in numeric_candidates:
-                    if col in df.columns:
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-
-                # Return the whole DF for flexibility in the dashboard
-                return df
-                
-        except Exception as e:
-            print(f"Query Failed: {e}")
-            pass
-    
-    return pd.DataFrame()
+    store = get_team_store()
+    positions = store["players"].get(player_name)
+    if positions is None:
+        return pd.DataFrame()
+    # Return the whole DF for flexibility in the dashboard
+    return _player_cache.get_or_load((player_name, store["version"]), _slice_player, store, positions)
+
+def _slice_player(store, positions):
+    return store["df"].iloc[positions].reset_index(drop=True)
 
 def get_team_aggregates():
     """Get team-wide stats for top cards."""
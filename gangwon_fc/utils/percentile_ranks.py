@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# Percentile ranks of Gangwon players against reference groups.
+# Built once per team-store version from each player's latest value per metric
+# (one value per player, so frequently tested players do not dominate). For every
+# metric and reference group (whole squad, position, age band) the values are kept
+# as a sorted array; a player's percentile is then two binary searches.
+#   index = PercentileIndex(team_df, RADAR_METRICS)
+#   index.profile('Kim', group='position')  -> {'Power': 72.5, ...}
+
+# Radar axes -> candidate columns (first present is used); higher is better for all
+RADAR_METRICS = {
+    "Power": ("CMJ_Height_Imp_mom_", "CMJ_Height_Imp_mom"),
+    "Reactive": ("CMJ_RSI_mod_Imp_mom",),
+    "Squat Jump": ("SquatJ_Height_Imp_mom_", "SquatJ_Height_Imp_mom"),
+    "Single Leg": ("SLJ_Avg",),
+    "Hamstring": ("Hamstring_Ecc_Avg",),
+    "Hip Adduction": ("HipAdd_Avg",),
+}
+
+POSITION_COLUMNS = ("Position", "Pos")
+AGE_COLUMNS = ("Age",)
+BIRTH_COLUMNS = ("Birth_Date", "Birth_date", "DOB")
+# Width of an age band in years (e.g. 20-21, 22-23, ...)
+AGE_BAND_YEARS = 2
+
+
+def _first_present(columns, candidates):
+    return next((c for c in candidates if c in columns), None)
+
+
+def _age_band(age):
+    if pd.isna(age):
+        return None
+    lo = int(age // AGE_BAND_YEARS * AGE_BAND_YEARS)
+    return f"{lo}-{lo + AGE_BAND_YEARS - 1}"
+
+
+class PercentileIndex:
+    """Sorted latest-value arrays per (group kind, group label, metric) for one team-store version."""
+
+    def __init__(self, df, metrics=None):
+        metrics = RADAR_METRICS if metrics is None else metrics
+        columns = set(df.columns)
+        self.metrics = {label: col for label, col in
+                        ((label, _first_present(columns, cands)) for label, cands in metrics.items()) if col}
+        self.groups = {}   # player -> {group kind: label}
+        self.group_kinds = ['squad']
+        self._sorted = {}  # (group kind, label, metric label) -> sorted values
+        if df.empty or 'Name' not in columns:
+            self.latest = pd.DataFrame(columns=list(self.metrics))
+            return
+
+        # Latest non-null value per player and metric (df is in Test_Date order)
+        by_player = df.groupby('Name', sort=True)
+        self.latest = pd.DataFrame({label: pd.to_numeric(by_player[col].last(), errors='coerce')
+                                    for label, col in self.metrics.items()})
+
+        labels = pd.DataFrame(index=self.latest.index)
+        labels['squad'] = 'all'
+        pos_col = _first_present(columns, POSITION_COLUMNS)
+        if pos_col:
+            labels['position'] = by_player[pos_col].last()
+        age = self._latest_age(df, by_player, columns)
+        if age is not None:
+            labels['age_band'] = age.map(_age_band)
+        self.group_kinds = list(labels.columns)
+        self.groups = labels.to_dict(orient='index')
+
+        for kind in self.group_kinds:
+            for label, members in labels.groupby(kind).groups.items():
+                block = self.latest.loc[members]
+                for metric in self.metrics:
+                    values = block[metric].to_numpy(dtype=float)
+                    self._sorted[(kind, label, metric)] = np.sort(values[~np.isnan(values)])
+
+    @staticmethod
+    def _latest_age(df, by_player, columns):
+        age_col = _first_present(columns, AGE_COLUMNS)
+        if age_col:
+            return pd.to_numeric(by_player[age_col].last(), errors='coerce')
+        birth_col = _first_present(columns, BIRTH_COLUMNS)
+        if birth_col and 'Test_Date' in columns:
+            birth = pd.to_datetime(by_player[birth_col].last(), errors='coerce')
+            tested = by_player['Test_Date'].last()
+            return (tested - birth).dt.days / 365.25
+        return None
+
+    def available_groups(self):
+        """Group kinds this data supports ('squad' always, 'position' / 'age_band' if the columns exist)."""
+        return list(self.group_kinds)
+
+    def percentile(self, player, metric, group='squad'):
+        """
+        Percentile rank (0-100, ties counted half) of the player's latest value within the
+        player's reference group, or NaN if the player/metric has no value.
+        """
+        if player not in self.groups or metric not in self.metrics:
+            return float('nan')
+        value = self.latest.at[player, metric]
+        ref = self._sorted.get((group, self.groups[player].get(group), metric))
+        if pd.isna(value) or ref is None or not len(ref):
+            return float('nan')
+        below = np.searchsorted(ref, value, side='left')
+        at_or_below = np.searchsorted(ref, value, side='right')
+        return float((below + at_or_below) / 2 / len(ref) * 100)
+
+    def profile(self, player, group='squad'):
+        """{metric label: percentile} for the radar (NaN where the player has no value)."""
+        return {metric: self.percentile(player, metric, group) for metric in self.metrics}
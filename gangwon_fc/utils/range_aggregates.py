@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# Prefix-sum aggregates over the date-sorted Gangwon team frame.
+# For every numeric metric the cumulative sum and count of non-null values are
+# precomputed once per data version, team-wide and per player. The mean / count
+# of any date range is then two binary searches on the day numbers plus an O(1)
+# difference of the cumulative arrays - independent of how many seasons are stored.
+#   aggs = RangeAggregates(df, groups={name: row positions})
+#   aggs.mean('CMJ_Height_Imp_mom', start_date, end_date)
+#   aggs.group_means('SLJ_Avg', start_date, end_date)  -> DataFrame [Name, SLJ_Avg]
+# Rows without a Test_Date are sorted last and never fall inside a range.
+
+_NO_DATE = np.iinfo(np.int64).max
+
+
+def _day_numbers(dates):
+    """datetime64 values -> int64 day numbers (NaT -> _NO_DATE, sorts last)."""
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    days = dates.astype('datetime64[D]').astype(np.int64)
+    days[np.isnat(dates)] = _NO_DATE
+    return days
+
+
+def _day(value):
+    return pd.Timestamp(value).to_datetime64().astype('datetime64[D]').astype(np.int64)
+
+
+def _cumulative(values):
+    """(cumulative sums, cumulative counts) of the non-null values, each with a leading 0."""
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid, dtype=np.int64)))
+    return sums, counts
+
+
+class RangeAggregates:
+    """Cumulative sum/count arrays per metric (team-wide and per player) over a frame sorted by Test_Date."""
+
+    def __init__(self, df, metrics=None, groups=None):
+        if metrics is None:
+            metrics = list(df.select_dtypes('number').columns)
+        self.metrics = [m for m in metrics if m in df.columns]
+        days = _day_numbers(df['Test_Date'].values) if 'Test_Date' in df.columns else np.full(len(df), _NO_DATE)
+        values = {m: pd.to_numeric(df[m], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+                  for m in self.metrics}
+
+        # Team-wide: rows are already in date order
+        self._days = days
+        self._team = {m: _cumulative(v) for m, v in values.items()}
+
+        # Per player: rows laid out player by player (each in date order) and
+        # searched on one combined key  code * span + day offset
+        groups = groups or {}
+        self.group_names = np.array(list(groups.keys()), dtype=object)
+        order = (np.concatenate([np.asarray(p, dtype=np.int64) for p in groups.values()])
+                 if groups else np.array([], dtype=np.int64))
+        codes = np.repeat(np.arange(len(groups), dtype=np.int64),
+                          [len(p) for p in groups.values()]) if groups else order
+        dated = days[order] != _NO_DATE
+        self._day0 = int(days[order][dated].min()) if dated.any() else 0
+        self._span = (int(days[order][dated].max()) - self._day0 + 2) if dated.any() else 2
+        offsets = np.where(dated, days[order] - self._day0, self._span - 1)
+        self._group_keys = codes * self._span + offsets
+        self._group = {m: _cumulative(v[order]) for m, v in values.items()}
+
+    def __contains__(self, metric):
+        return metric in self._team
+
+    def _team_bounds(self, start_date, end_date):
+        lo = np.searchsorted(self._days, _day(start_date), side='left')
+        hi = np.searchsorted(self._days, _day(end_date) + 1, side='left')
+        return lo, hi
+
+    def _group_bounds(self, start_date, end_date):
+        base = np.arange(len(self.group_names), dtype=np.int64) * self._span
+        lo_off = np.clip(_day(start_date) - self._day0, 0, self._span - 1)
+        hi_off = np.clip(_day(end_date) + 1 - self._day0, 0, self._span - 1)
+        lo = np.searchsorted(self._group_keys, base + lo_off, side='left')
+        hi = np.searchsorted(self._group_keys, base + hi_off, side='left')
+        return lo, hi
+
+    def count(self, metric, start_date, end_date):
+        """Number of non-null values of a metric between two dates (inclusive, whole days)."""
+        sums, counts = self._team[metric]
+        lo, hi = self._team_bounds(start_date, end_date)
+        return int(counts[hi] - counts[lo])
+
+    def mean(self, metric, start_date, end_date):
+        """Team mean of a metric between two dates (NaN if there are no values)."""
+        sums, counts = self._team[metric]
+        lo, hi = self._team_bounds(start_date, end_date)
+        n = counts[hi] - counts[lo]
+        return float((sums[hi] - sums[lo]) / n) if n else float('nan')
+
+    def group_means(self, metric, start_date, end_date):
+        """
+        Per-player mean of a metric between two dates as DataFrame [Name, metric],
+        for every player with at least one test in the range (NaN if none has a value).
+        """
+        sums, counts = self._group[metric]
+        lo, hi = self._group_bounds(start_date, end_date)
+        n = counts[hi] - counts[lo]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(n > 0, (sums[hi] - sums[lo]) / np.maximum(n, 1), np.nan)
+        present = hi > lo
+        return pd.DataFrame({'Name': self.group_names[present], metric: means[present]})
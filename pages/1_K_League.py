@@ -1,14 +1,15 @@
 
 import streamlit as st
-from utils.data_loader import load_data, process_data, inject_missing_test_ids
-from templates import template_association
 
 # Page Config
-from utils import auth
+from utils import auth, cache_warmup
 
 # Page Config
 st.set_page_config(page_title="K-League Platform", page_icon="⚽", layout="wide")
 
+# Process-wide background warm-up (no-op once started, see Home.py)
+cache_warmup.start()
+
 # --- Authentication Logic ---
 if 'logged_in' not in st.session_state:
     st.session_state['logged_in'] = False
@@ -67,14 +68,26 @@ if st.button("로그아웃 (Logout)", key="logout_btn_granted"):
 st.divider()
 
 # Core Logic
+# Heavy modules (pandas/plotly via the loader and template) load only after login
+from utils.data_loader import load_prepared, load_aggregate, KLEAGUE_PROJECT, KLEAGUE_DATASET, KLEAGUE_TABLE
+from templates import template_association
+from utils import refresh_scheduler
+
 try:
-    # Load Raw Data from BigQuery
-    df_raw = load_data("kleague-482106", "Kleague_db", "measurements")
-    df_raw = inject_missing_test_ids(df_raw)
-    df = process_data(df_raw)
+    # Load prepared data (cached per data version; only the columns the selected tab declares)
+    def load_view(columns):
+        return load_prepared(KLEAGUE_PROJECT, KLEAGUE_DATASET, KLEAGUE_TABLE, columns=columns)
     
+    # Group-by averages pushed down to BigQuery (cached per data version + filter signature)
+    def load_agg(metrics, group_by, filters):
+        return load_aggregate(KLEAGUE_PROJECT, KLEAGUE_DATASET, KLEAGUE_TABLE, metrics, group_by=group_by, filters=filters)
+
     # Show Dashboard
-    template_association.show_dashboard(df)
+    template_association.show_dashboard(load_view, load_agg)
+
+    as_of = refresh_scheduler.as_of_label(f"{KLEAGUE_PROJECT}.{KLEAGUE_DATASET}.{KLEAGUE_TABLE}")
+    if as_of:
+        st.caption(as_of)
     
 except Exception as e:
     st.error(f"시스템 오류 (데이터 로드 실패): {e}")
@@ -1,15 +1,17 @@
 
 import streamlit as st
-from templates import template_center
 
 # Page Config
 st.set_page_config(page_title="Yoon Chung-gu Center", page_icon="🏋️", layout="wide")
 
-from utils import auth
+from utils import auth, cache_warmup
 
 # Page Config
 st.set_page_config(page_title="Yoon Chung-gu Center", page_icon="🏋️", layout="wide")
 
+# Process-wide background warm-up (no-op once started, see Home.py)
+cache_warmup.start()
+
 # --- Authentication Logic ---
 if 'logged_in' not in st.session_state:
     st.session_state['logged_in'] = False
@@ -69,9 +71,10 @@ st.divider()
 
 # Core Logic
 # The template_center handles its own data loading via SQLite now
+# (imported after login: it pulls in pandas/plotly)
+from templates import template_center
+
 try:
-    import importlib
-    importlib.reload(template_center)
     template_center.show_dashboard() 
 except Exception as e:
     st.error(f"시스템 오류: {e}")
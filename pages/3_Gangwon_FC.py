@@ -2,8 +2,11 @@
 import streamlit as st
 st.set_page_config(layout="wide", page_title="Gangwon FC Dashboard", page_icon="⚽")
 
+# Process-wide background warm-up (no-op once started, see Home.py)
+from utils import auth, cache_warmup
+cache_warmup.start()
+
 # --- Authentication Logic (Gatekeeper) ---
-from utils import auth
 
 if 'logged_in' not in st.session_state:
     st.session_state['logged_in'] = False
@@ -55,11 +58,7 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from gangwon_fc.utils import gangwon_data_loader as data_loader
-import importlib
-try:
-    importlib.reload(data_loader)
-except:
-    pass
+from utils import refresh_scheduler
 
 # --- Custom CSS ---
 st.markdown("""
@@ -105,10 +104,11 @@ if 'gw_view_mode' not in st.session_state:
 # Load Global Data for Sidebar Filters (Date Range)
 try:
     with st.spinner("Initializing..."):
-        df_global = data_loader.get_full_team_data()
-        if not df_global.empty:
-            min_date = df_global['Test_Date'].min()
-            max_date = df_global['Test_Date'].max()
+        # Shared frame, sorted/indexed by Test_Date: read-only, filtered by range views below
+        df_global = data_loader.get_team_frame()
+        if not df_global.empty and df_global['Test_Date'].notna().any():
+            min_date = df_global['Test_Date'].min().date()
+            max_date = df_global['Test_Date'].max().date()
         else:
             import datetime
             min_date = datetime.date(2024, 1, 1)
@@ -145,6 +145,9 @@ with st.sidebar:
         st.rerun()
     
     st.markdown("---")
+    as_of = refresh_scheduler.as_of_label("gangwon")
+    if as_of:
+        st.caption(as_of)
     if st.button("Logout"):
         auth.logout()
 
@@ -182,28 +185,12 @@ start_date, end_date = st.slider(
 st.markdown("<br>", unsafe_allow_html=True) # Spacer
 
 # --- Helper functions ---
-def safe_mean(df, col):
-    if col in df.columns:
-        return df[col].mean()
+def range_mean(aggs, col):
+    """Team mean of a metric over the selected dates (prefix sums, see range_aggregates)."""
+    if aggs is not None and col in aggs:
+        return aggs.mean(col, start_date, end_date)
     return 0
 
-def calculate_derived_cols(df):
-    # SLJ: Prioritize L/R average, fallback to single column
-    if 'SLJ_Height_L' in df.columns and 'SLJ_Avg' not in df.columns:
-        df['SLJ_Avg'] = df[['SLJ_Height_L', 'SLJ_Height_R']].mean(axis=1)
-    elif 'SLJ_Height_Imp_mom_' in df.columns and 'SLJ_Avg' not in df.columns:
-         df['SLJ_Avg'] = df['SLJ_Height_Imp_mom_']
-
-    if 'Hamstring_Ecc_L' in df.columns and 'Hamstring_Ecc_Avg' not in df.columns:
-        df['Hamstring_Ecc_Avg'] = df[['Hamstring_Ecc_L', 'Hamstring_Ecc_R']].mean(axis=1)
-    if 'Hamstring_ISO_L' in df.columns and 'Hamstring_ISO_Avg' not in df.columns:
-        df['Hamstring_ISO_Avg'] = df[['Hamstring_ISO_L', 'Hamstring_ISO_R']].mean(axis=1)
-    if 'HipAdd_L' in df.columns and 'HipAdd_Avg' not in df.columns:
-        df['HipAdd_Avg'] = df[['HipAdd_L', 'HipAdd_R']].mean(axis=1)
-    if 'HipAbd_L' in df.columns and 'HipAbd_Avg' not in df.columns:
-        df['HipAbd_Avg'] = df[['HipAbd_L', 'HipAbd_R']].mean(axis=1)
-    return df
-
 # --- VIEW: Team Dashboard ---
 if st.session_state['gw_view_mode'] == 'Team Dashboard':
     # title removed
@@ -213,21 +200,16 @@ if st.session_state['gw_view_mode'] == 'Team Dashboard':
         st.warning("No data available.")
         st.stop()
         
-    # Fix TypeError: Convert date objects to Timestamp for datetime64 comparison -> REVERTED
-    # Since df has date objects, we compare with date objects directly
-    
-    mask = (df_global['Test_Date'] >= start_date) & (df_global['Test_Date'] <= end_date)
-    df_team = df_global.loc[mask]
+    # Binary search on the sorted Test_Date (datetime64), no boolean mask over the table
+    df_team = data_loader.date_range_view(df_global, start_date, end_date)
     
     if df_team.empty:
         st.warning(f"No data found between {start_date} and {end_date}.")
         st.stop()
         
-    if df_team.empty:
-        st.warning("No data available.")
-        st.stop()
-        
-    df_team = calculate_derived_cols(df_team)
+    # Derived columns come with the store; means/rankings below use the precomputed
+    # prefix sums, so a slider change never rescans the frame
+    aggs = data_loader.get_range_aggregates()
     
     # Identify correct columns (Prioritize trailing underscore versions if present)
     col_cmj = 'CMJ_Height_Imp_mom_' if 'CMJ_Height_Imp_mom_' in df_team.columns else 'CMJ_Height_Imp_mom'
@@ -235,13 +217,13 @@ if st.session_state['gw_view_mode'] == 'Team Dashboard':
     
     # 1. 7 KPI Boxes
     kpis = [
-        ("CMJ (Avg)", safe_mean(df_team, col_cmj)),
-        ("Squat Jump (Avg)", safe_mean(df_team, col_sj)),
-        ("Single Jump (Avg)", safe_mean(df_team, 'SLJ_Avg')),
-        ("Hamstring Ecc (Avg)", safe_mean(df_team, 'Hamstring_Ecc_Avg')),
-        ("Hamstring ISO (Avg)", safe_mean(df_team, 'Hamstring_ISO_Avg')),
-        ("Hip Add (Avg)", safe_mean(df_team, 'HipAdd_Avg')),
-        ("Hip Abd (Avg)", safe_mean(df_team, 'HipAbd_Avg')),
+        ("CMJ (Avg)", range_mean(aggs, col_cmj)),
+        ("Squat Jump (Avg)", range_mean(aggs, col_sj)),
+        ("Single Jump (Avg)", range_mean(aggs, 'SLJ_Avg')),
+        ("Hamstring Ecc (Avg)", range_mean(aggs, 'Hamstring_Ecc_Avg')),
+        ("Hamstring ISO (Avg)", range_mean(aggs, 'Hamstring_ISO_Avg')),
+        ("Hip Add (Avg)", range_mean(aggs, 'HipAdd_Avg')),
+        ("Hip Abd (Avg)", range_mean(aggs, 'HipAbd_Avg')),
     ]
     
     cols = st.columns(7)
@@ -270,8 +252,8 @@ if st.session_state['gw_view_mode'] == 'Team Dashboard':
     y_col = col_map[metric_opt]
     
     # Aggregation by Player (Mean of all their records)
-    if y_col in df_team.columns:
-        df_agg = df_team.groupby("Name")[y_col].mean().reset_index().sort_values(y_col, ascending=False)
+    if aggs is not None and y_col in aggs:
+        df_agg = aggs.group_means(y_col, start_date, end_date).sort_values(y_col, ascending=False)
         fig = px.bar(df_agg, x="Name", y=y_col, color=y_col, color_continuous_scale="Greens", text_auto='.1f', title=f"Team Ranking: {metric_opt}")
         
         # UI Updates: 90deg rotate, no color bar
@@ -292,8 +274,8 @@ if st.session_state['gw_view_mode'] == 'Team Dashboard':
     col_map_s = {"Hamstring Ecc": "Hamstring_Ecc_Avg", "Hamstring ISO": "Hamstring_ISO_Avg", "HipAdd": "HipAdd_Avg", "HipAbd": "HipAbd_Avg"}
     y_col_s = col_map_s[metric_opt_s]
     
-    if y_col_s in df_team.columns:
-        df_agg_s = df_team.groupby("Name")[y_col_s].mean().reset_index().sort_values(y_col_s, ascending=False)
+    if aggs is not None and y_col_s in aggs:
+        df_agg_s = aggs.group_means(y_col_s, start_date, end_date).sort_values(y_col_s, ascending=False)
         fig_s = px.bar(df_agg_s, x="Name", y=y_col_s, color=y_col_s, color_continuous_scale="Oranges", text_auto='.0f', title=f"Team Ranking: {metric_opt_s}")
         
         # UI Updates: 90deg rotate, no color bar
@@ -323,17 +305,11 @@ elif st.session_state['gw_view_mode'] == 'Player Dashboard':
         if df_p.empty:
             st.warning("No data found for this player.")
         else:
-            # Apply Date Filter (Fix TypeError)
-            # ts_start = pd.Timestamp(start_date) -> REVERTED
-            # ts_end = pd.Timestamp(end_date)
-            
-            mask_p = (df_p['Test_Date'] >= start_date) & (df_p['Test_Date'] <= end_date)
-            df_p = df_p.loc[mask_p]
+            # Apply Date Filter (player slices are in Test_Date order)
+            df_p = data_loader.date_range_view(df_p, start_date, end_date)
             
             if df_p.empty:
                 st.warning(f"No data for {selected_player} in the selected range.")
-            else:
-                df_p = calculate_derived_cols(df_p)
             
             # Identify correct columns (Prioritize trailing underscore versions if present)
             col_cmj = 'CMJ_Height_Imp_mom_' if 'CMJ_Height_Imp_mom_' in df_p.columns else 'CMJ_Height_Imp_mom'
@@ -351,6 +327,9 @@ elif st.session_state['gw_view_mode'] == 'Player Dashboard':
                 """
                 fig = go.Figure()
                 has_data = False
+                # Test_Date is datetime64 (for the range views); the category axis ignores
+                # tickformat, so label the x values as plain dates
+                dates = df['Test_Date'].dt.strftime('%Y-%m-%d')
                 colors = ['#006442', '#F37021', '#1f77b4', '#d62728'] # Gangwon Colors + Defaults
                 
                 # Check for empty columns first
@@ -362,14 +341,14 @@ elif st.session_state['gw_view_mode'] == 'Player Dashboard':
                 for i, (label, col) in enumerate(valid_cols):
                     if chart_type == 'bar':
                         fig.add_trace(go.Bar(
-                            x=df['Test_Date'], 
+                            x=dates, 
                             y=df[col], 
                             name=label,
                             marker_color=colors[i % len(colors)]
                         ))
                     else:
                         fig.add_trace(go.Scatter(
-                            x=df['Test_Date'], 
+                            x=dates, 
                             y=df[col], 
                             name=label, 
                             mode='lines+markers',
@@ -438,8 +417,11 @@ elif st.session_state['gw_view_mode'] == 'Player Dashboard':
             # Identify numeric columns for formatting
             numeric_cols = df_p.select_dtypes(include=[np.number]).columns.tolist()
             
+            # Test_Date shown as a date (datetime64 would render a 00:00:00 time)
+            df_log = df_p.sort_values('Test_Date', ascending=False)
+            df_log = df_log.assign(Test_Date=df_log['Test_Date'].dt.date)
             st.dataframe(
-                df_p.sort_values('Test_Date', ascending=False).style.format("{:.1f}", subset=numeric_cols, na_rep="-"),
+                df_log.style.format("{:.1f}", subset=numeric_cols, na_rep="-"),
                 use_container_width=True,
                 hide_index=True
             )
@@ -451,16 +433,12 @@ elif st.session_state['gw_view_mode'] == 'Insight Analysis':
         st.warning("No data available.")
         st.stop()
         
-    mask = (df_global['Test_Date'] >= start_date) & (df_global['Test_Date'] <= end_date)
-    df_insight = df_global.loc[mask]
+    df_insight = data_loader.date_range_view(df_global, start_date, end_date)
     
     if df_insight.empty:
         st.warning(f"No data found between {start_date} and {end_date}.")
         st.stop()
         
-    # Ensure derived cols are calculated
-    df_insight = calculate_derived_cols(df_insight)
-    
     # Improve Column Selection
     col_cmj = 'CMJ_Height_Imp_mom_' if 'CMJ_Height_Imp_mom_' in df_insight.columns else 'CMJ_Height_Imp_mom'
     col_sj  = 'SquatJ_Height_Imp_mom_' if 'SquatJ_Height_Imp_mom_' in df_insight.columns else 'SquatJ_Height_Imp_mom'
@@ -603,25 +581,31 @@ elif st.session_state['gw_view_mode'] == 'Insight Analysis':
         - **Z > 1.0**: 컨디션이 매우 좋음 (Peaking).
         """)
         
-    # Need Full History for this calculation, not just filtered range
-    # But for simplicity, we use df_global but calculate stats per player
-    if col_cmj in df_global.columns:
-        # 1. Calc Player Stats (Mean/Std) from ALL data
-        stats = df_global.groupby('Name')[col_cmj].agg(['mean', 'std']).reset_index()
+    # Baselines (mean/std over each player's full history) are kept incrementally with the
+    # store; the z-score table for every metric is precomputed (see utils.baselines)
+    table = data_loader.get_baselines()
+    if table is not None and table.metrics:
+        z_metrics = table.metrics
+        z_metric = st.selectbox("Metric", z_metrics, index=z_metrics.index(col_cmj) if col_cmj in z_metrics else 0, key="z_metric")
         
-        # 2. Get LATEST record for each player within the selected date range
-        latest_recs = df_insight.sort_values('Test_Date').groupby('Name').tail(1)[['Name', 'Test_Date', col_cmj]]
-        
-        merged = pd.merge(latest_recs, stats, on='Name')
-        merged['Z_Score'] = (merged[col_cmj] - merged['mean']) / merged['std']
+        if table.watermark is None or end_date >= table.watermark.date():
+            # Range includes each player's latest test: precomputed table
+            z_table = table.z
+        else:
+            # Latest value per player within the selected range vs. the full-history baseline
+            z_table = table.zscores(df_insight.groupby('Name')[z_metrics].last())
+        z_table = z_table[z_table.index.isin(df_insight['Name'].unique())]
         
-        # Filter NaNs
-        merged = merged.dropna(subset=['Z_Score'])
+        merged = z_table[z_metric].dropna().rename('Z_Score').reset_index()
+        merged.columns = ['Name', 'Z_Score']
         
         fig_z = px.bar(merged, x='Name', y='Z_Score', color='Z_Score', 
                        color_continuous_scale='RdYlGn', range_color=[-2, 2],
-                       title=f"Neuromuscular Fatigue Status")
+                       title=f"Neuromuscular Fatigue Status ({z_metric})")
         
         fig_z.add_hline(y=-1.5, line_width=2, line_dash="dash", line_color="red")
         fig_z.add_hline(y=0, line_width=1, line_color="gray")
         st.plotly_chart(fig_z, use_container_width=True)
+        
+        with st.expander("전체 지표 Z-Score (Squad x Metric)"):
+            st.dataframe(z_table.style.format("{:.2f}", na_rep="-"), use_container_width=True)
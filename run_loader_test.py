@@ -22,10 +22,10 @@ def test_connection():
     if client:
         print("Client successfully created!")
         try:
-            query = "SELECT * FROM `gangwonfc.vald_data.vald_all_data` LIMIT 0"
-            df = client.query(query).to_dataframe()
-            print("Query Successful!")
-            print("Columns:", df.columns.tolist())
+            from utils import schema_cache
+            info = schema_cache.get_table_info(client, "gangwonfc.vald_data.vald_all_data")
+            print("Metadata Read Successful!")
+            print("Columns:", info['columns'])
         except Exception as e:
             print(f"Query Failed: {e}")
     else:
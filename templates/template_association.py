@@ -5,8 +5,63 @@ import plotly.express as px
 import plotly.graph_objects as go
 import os
 from utils.ui_utils import get_base64_of_bin_file
-
-def show_dashboard(df):
+from utils.data_loader import column_set
+from utils import query_builder, growth_engine
+
+# Metrics Mapping (Protocol tab)
+METRIC_GROUPS = {
+    "신체 프로필": {"metrics": ["Height", "Weight"], "names": ["신장 (Height)", "체중 (Weight)"], "units": ["cm", "kg"], "desc": ["선수의 키", "몸무게"]},
+    "스피드": {"metrics": ["_5m_sec_", "_10m_sec_", "_30m_sec_"], "names": ["5m 스프린트", "10m 스프린트", "30m 스프린트"], "units": ["sec", "sec", "sec"], "inverse": [True]*3, "desc": ["초기 가속", "중거리 가속", "최대 속도"]},
+    "민첩성": {"metrics": ["COD_sec_", "COD_ball_sec_"], "names": ["방향 전환 (COD)", "방향 전환 (Ball)"], "units": ["sec", "sec"], "inverse": [True, True], "desc": ["General Agility", "Agility with Ball"]},
+    "근력": {"metrics": ["HamECC_L_N_", "HamECC_R_N_", "HipAdd_L_N_", "HipAdd_R_N_", "HipAbd_L_N_", "HipAbd_R_N_", "ShoulderIR_L_N_", "ShoulderIR_R_N_", "ShoulderER_L_N_", "ShoulderER_R_N_"], "names": ["햄스트링 L", "햄스트링 R", "고관절 모음 L", "고관절 모음 R", "고관절 벌림 L", "고관절 벌림 R", "어깨 내회전 L", "어깨 내회전 R", "어깨 외회전 L", "어깨 외회전 R"], "units": ["N"]*10, "desc": [""]*10},
+    "파워": {"metrics": ["CMJ_Height_cm_", "CMJ_TakeoffConcentricPeakForce_N_", "CMRJ_RSI_Point_", "SquatJ_Height_cm_", "IMTP_N_", "Strength_Sum"], "names": ["CMJ 높이", "CMJ Peak Force", "CMRJ RSI", "Squat Jump", "IMTP", "근력 합계"], "units": ["cm", "N", "Idx", "cm", "N", "N"], "desc": ["반동 점프 높이", "점프 최대 힘", "탄력성 지수", "무반동 점프", "등척성 최대 근력", "전신 근력 합계"]}
+}
+
+# 10-point score columns (Player tab radar)
+POINT_COLUMNS = [
+    "APHV_Point_", "HamECC_L_Point_", "HamECC_R_Point_", "HipAdd_L_Point_", "HipAdd_R_Point_",
+    "HipAbd_L_Point_", "HipAbd_R_Point_", "ShoulderIR_L_Point_", "ShoulderIR_R_Point_",
+    "ShoulderER_L_Point_", "ShoulderER_R_Point_", "_5m_sec__Point_", "_10m_sec__Point_", "_30m_sec__Point_",
+    "COD_Point_", "COD_ball_Point_", "CMJ_Height_Point_", "CMJ_TakeoffConcentricPeakForce_Point_",
+    "CMRJ_RSI_Point_", "SquatJ_Height_Point_", "IMTP_Point_", "EUR_CMJ_SquatJ_Point_",
+    "DSI_CMJ_IMTP_Point_", "Strength_Sum_Point_"
+]
+
+# Columns each tab needs on top of data_loader.BASE_COLUMNS (only these are fetched & cached)
+VIEW_COLUMNS = {
+    "홈": column_set(),
+    "프로토콜": column_set(*[g["metrics"] for g in METRIC_GROUPS.values()]),
+    "인사이트": column_set(["Age", "Height", "Weight", "APHV"]),
+    "Player": column_set(["Height", "Weight"], POINT_COLUMNS),
+}
+
+def resolve_metric_col(df, col_name):
+    """Column holding a METRIC_GROUPS metric in `df` (trailing '_' stripped, legacy names), or None."""
+    clean_col = col_name.strip('_')
+    if clean_col in df.columns: return clean_col
+    if col_name in df.columns: return col_name
+    map_legacy = {'5m_sec': '5m_Sprint', '10m_sec': '10m_Sprint', '30m_sec': '30m_Sprint', 'COD_sec': 'COD_L', 'CMJ_Height_cm': 'Jump_CMJ', 'SquatJ_Height_cm': 'Jump_SQ'}
+    if clean_col in map_legacy and map_legacy[clean_col] in df.columns: return map_legacy[clean_col]
+    return None
+
+def agg_means(agg, group_col, metric):
+    """[group_col, metric] means from a load_aggregate frame (SUM / COUNT per group), or None."""
+    if agg is None or f"{metric}__sum" not in agg.columns:
+        return None
+    out = agg[agg[f"{metric}__n"] > 0]
+    return pd.DataFrame({
+        group_col: out[group_col].values,
+        metric: (out[f"{metric}__sum"] / out[f"{metric}__n"]).values,
+    })
+
+def show_dashboard(load_view, load_aggregate=None):
+    """
+    load_view: callable(columns) -> processed DataFrame with (at least) those columns.
+    A DataFrame may also be passed directly (all columns already loaded).
+    load_aggregate: optional callable(metrics, group_by, filters) -> SUM/COUNT frame computed
+    by BigQuery (see data_loader.load_aggregate) or None; trend/team averages fall back to
+    the local frame when it is missing or fails.
+    """
     # --- CSS Styling for "World Class" Design ---
     st.markdown("""
     <style>
@@ -173,8 +228,15 @@ def show_dashboard(df):
 
     st.markdown("<div style='margin-bottom: 30px;'></div>", unsafe_allow_html=True) # Spacer
 
+    # Load only the columns the selected tab needs
+    if isinstance(load_view, pd.DataFrame):
+        df = load_view
+    else:
+        view_key = next(k for k in VIEW_COLUMNS if k in selected_tab)
+        df = load_view(VIEW_COLUMNS[view_key])
+
     # Common Logic
-    df['Test_ID'] = df['Test_ID'].astype(str)
+    # df is the cached, shared frame (Test_ID already string-typed at load) - never mutate it in place
 
     # ==========================================
     # Tab: Home
@@ -182,7 +244,7 @@ def show_dashboard(df):
     if "홈" in selected_tab:
         
         # Top KPI Section (New Design)
-        all_test_ids_home = sorted([x for x in df['Test_ID'].unique() if x and x.lower() != 'nan' and x != 'None'], reverse=True)
+        all_test_ids_home = sorted([x for x in df['Test_ID'].unique() if isinstance(x, str) and x and x.lower() != 'nan' and x != 'None'], reverse=True)
         sel_home_test_id = st.sidebar.selectbox("측정 차수 (Test ID)", ["All"] + all_test_ids_home, index=0) # Move filter to sidebar for cleaner Hero
         
         home_df = df.copy()
@@ -225,7 +287,7 @@ def show_dashboard(df):
         with col_home_1:
             with st.container(border=True):
                 st.markdown('<div class="section-title">측정 현황 (Trends)</div>', unsafe_allow_html=True)
-                trend_stats = df.groupby('Test_ID')['Test_ID'].count().reset_index(name='Count').sort_values('Test_ID')
+                trend_stats = df.groupby('Test_ID', observed=True)['Test_ID'].count().reset_index(name='Count').sort_values('Test_ID')
                 
                 # Spacer to match the Selectbox height on the right (approx 45px)
                 st.markdown("<div style='height: 45px;'></div>", unsafe_allow_html=True)
@@ -260,6 +322,7 @@ def show_dashboard(df):
                     team_df_sub = df[df['Team'] == sel_team].copy()
                     team_comp = team_df_sub['Grade'].value_counts().reset_index()
                     team_comp.columns = ['Grade', 'Count']
+                    team_comp = team_comp[team_comp['Count'] > 0] # Grade is categorical: drop unobserved grades
                     
                     grade_order = ['중1', '중2', '중3', '고1', '고2', '고3']
                     team_comp['Grade'] = pd.Categorical(team_comp['Grade'], categories=grade_order, ordered=True)
@@ -317,28 +380,28 @@ def show_dashboard(df):
         if f_team != "All": p_df = p_df[p_df['Team'] == f_team]
         if f_grade != "All": p_df = p_df[p_df['Grade'] == f_grade]
         if pos_col and f_pos != "All": p_df = p_df[p_df[pos_col] == f_pos]
-        if f_name: p_df = p_df[p_df['Name'].str.contains(f_name, na=False)]
+        # Player holds the names (Name exists only on the injected placeholder rows)
+        if f_name: p_df = p_df[p_df['Player'].astype(str).str.contains(f_name, na=False, regex=False)]
+
+        # Same filters pushed down to BigQuery for the group-by averages (cached per filter signature)
+        pushdown_filters = {}
+        if f_test_id != "All": pushdown_filters['Test_ID'] = f_test_id
+        if f_team != "All": pushdown_filters['Team'] = f_team
+        if f_grade != "All": pushdown_filters['Grade'] = f_grade
+        if pos_col and f_pos != "All": pushdown_filters[pos_col] = f_pos
+        if f_name: pushdown_filters['Player'] = query_builder.Contains(f_name)
+
+        def pushdown(metrics, group_col):
+            if load_aggregate is None or not metrics:
+                return None
+            return load_aggregate(metrics=tuple(metrics), group_by=(group_col,), filters=pushdown_filters)
 
         st.write("")
 
-        # Metrics Mapping (Same Logic, new Desc)
-        METRIC_GROUPS = {
-            "신체 프로필": {"metrics": ["Height", "Weight"], "names": ["신장 (Height)", "체중 (Weight)"], "units": ["cm", "kg"], "desc": ["선수의 키", "몸무게"]},
-            "스피드": {"metrics": ["_5m_sec_", "_10m_sec_", "_30m_sec_"], "names": ["5m 스프린트", "10m 스프린트", "30m 스프린트"], "units": ["sec", "sec", "sec"], "inverse": [True]*3, "desc": ["초기 가속", "중거리 가속", "최대 속도"]},
-            "민첩성": {"metrics": ["COD_sec_", "COD_ball_sec_"], "names": ["방향 전환 (COD)", "방향 전환 (Ball)"], "units": ["sec", "sec"], "inverse": [True, True], "desc": ["General Agility", "Agility with Ball"]},
-            "근력": {"metrics": ["HamECC_L_N_", "HamECC_R_N_", "HipAdd_L_N_", "HipAdd_R_N_", "HipAbd_L_N_", "HipAbd_R_N_", "ShoulderIR_L_N_", "ShoulderIR_R_N_", "ShoulderER_L_N_", "ShoulderER_R_N_"], "names": ["햄스트링 L", "햄스트링 R", "고관절 모음 L", "고관절 모음 R", "고관절 벌림 L", "고관절 벌림 R", "어깨 내회전 L", "어깨 내회전 R", "어깨 외회전 L", "어깨 외회전 R"], "units": ["N"]*10, "desc": [""]*10},
-            "파워": {"metrics": ["CMJ_Height_cm_", "CMJ_TakeoffConcentricPeakForce_N_", "CMRJ_RSI_Point_", "SquatJ_Height_cm_", "IMTP_N_", "Strength_Sum"], "names": ["CMJ 높이", "CMJ Peak Force", "CMRJ RSI", "Squat Jump", "IMTP", "근력 합계"], "units": ["cm", "N", "Idx", "cm", "N", "N"], "desc": ["반동 점프 높이", "점프 최대 힘", "탄력성 지수", "무반동 점프", "등척성 최대 근력", "전신 근력 합계"]}
-        }
         
         # Metric Render Function (Updated styling)
-        def render_metric_card(df, col_name, title, unit, desc, all_test_ids):
-            clean_col = col_name.strip('_')
-            target_col = None
-            if clean_col in df.columns: target_col = clean_col
-            elif col_name in df.columns: target_col = col_name
-            else:
-                 map_legacy = {'5m_sec': '5m_Sprint', '10m_sec': '10m_Sprint', '30m_sec': '30m_Sprint', 'COD_sec': 'COD_L', 'CMJ_Height_cm': 'Jump_CMJ', 'SquatJ_Height_cm': 'Jump_SQ'}
-                 if clean_col in map_legacy and map_legacy[clean_col] in df.columns: target_col = map_legacy[clean_col]
+        def render_metric_card(df, col_name, title, unit, desc, all_test_ids, agg=None):
+            target_col = resolve_metric_col(df, col_name)
             
             # Using HTML for Layout inside the Column
             if not target_col or df[target_col].dropna().empty:
@@ -351,12 +414,19 @@ def show_dashboard(df):
                  """, unsafe_allow_html=True)
                  return
             
-            df[target_col] = pd.to_numeric(df[target_col], errors='coerce')
-            val_df = df.dropna(subset=[target_col])
-            mean_val = val_df[target_col].mean()
-            
+            # Schema columns are already float32; only unregistered legacy columns need conversion
+            if not pd.api.types.is_numeric_dtype(df[target_col]):
+                df[target_col] = pd.to_numeric(df[target_col], errors='coerce')
             # Trend Chart (Line with Zoomed Y-axis & Full X-axis)
-            trend = val_df.groupby('Test_ID')[target_col].mean().reset_index().sort_values('Test_ID')
+            trend = agg_means(agg, 'Test_ID', target_col)
+            if trend is not None and not trend.empty:
+                # Pushed-down SUM/COUNT per Test_ID -> overall mean without touching the rows
+                mean_val = agg[f"{target_col}__sum"].sum() / agg[f"{target_col}__n"].sum()
+                trend = trend.sort_values('Test_ID')
+            else:
+                val_df = df.dropna(subset=[target_col])
+                mean_val = val_df[target_col].mean()
+                trend = val_df.groupby('Test_ID', observed=True)[target_col].mean().reset_index().sort_values('Test_ID')
             
             y_min = trend[target_col].min()
             y_max = trend[target_col].max()
@@ -404,6 +474,9 @@ def show_dashboard(df):
         active_cols = []
         if group:
             metrics = group['metrics']
+            # One pushdown query for every card of the tab
+            tab_cols = [c for c in (resolve_metric_col(p_df, m) for m in metrics) if c]
+            tab_agg = pushdown(tab_cols, 'Test_ID')
             n_cols = 2
             rows = [metrics[i:i + n_cols] for i in range(0, len(metrics), n_cols)]
             for row in rows:
@@ -415,7 +488,8 @@ def show_dashboard(df):
                              ac = render_metric_card(
                                  p_df, m, group['names'][m_idx], group['units'][m_idx], 
                                  group.get('desc', [""]*len(metrics))[m_idx],
-                                 sorted(df['Test_ID'].unique()) # Pass all Test IDs (global)
+                                 sorted(df['Test_ID'].unique()), # Pass all Test IDs (global)
+                                 agg=tab_agg
                             )
                              if ac: active_cols.append((group['names'][m_idx], ac))
 
@@ -428,8 +502,11 @@ def show_dashboard(df):
                     sel_n = st.selectbox("비교할 지표 선택", [ac[0] for ac in active_cols], label_visibility="collapsed")
                     sel_c = [ac[1] for ac in active_cols if ac[0] == sel_n][0]
                 
-                p_df[sel_c] = pd.to_numeric(p_df[sel_c], errors='coerce')
-                comp_df = p_df.dropna(subset=[sel_c]).groupby('Team')[sel_c].mean().reset_index()
+                comp_df = agg_means(pushdown([sel_c], 'Team'), 'Team', sel_c)
+                if comp_df is None:
+                    if not pd.api.types.is_numeric_dtype(p_df[sel_c]):
+                        p_df[sel_c] = pd.to_numeric(p_df[sel_c], errors='coerce')
+                    comp_df = p_df.dropna(subset=[sel_c]).groupby('Team', observed=True)[sel_c].mean().reset_index()
                 
                 if not comp_df.empty:
                     y_min = comp_df[sel_c].min()
@@ -601,28 +678,12 @@ def show_dashboard(df):
                  with r2_c2:
                      with st.container(border=True):
                          st.markdown('<div class="section-title">성장 속도 (Growth Velocity)</div>', unsafe_allow_html=True)
+                         # Velocities / PHV of all players, precomputed once per data version
+                         growth = growth_engine.get_growth(df)
                          target_players = mat_df['Player'].unique()
-                         history_df = df[df['Player'].isin(target_players)].copy()
-                         velocities = []
-                         if not history_df.empty:
-                             history_df = history_df.sort_values(['Player', 'Age'])
-                             for p in target_players:
-                                  p_df = history_df[history_df['Player'] == p]
-                                  if len(p_df) > 1:
-                                     p_df['H_Diff'] = p_df['Height'].diff()
-                                     p_df['Age_Diff'] = p_df['Age'].diff()
-                                     p_df = p_df[p_df['Age_Diff'] > 0] # Avoid zero division
-                                     p_df['Velocity'] = p_df['H_Diff'] / p_df['Age_Diff']
-                                     # Filter unreasonable values
-                                     p_df = p_df[(p_df['Velocity'] > 0) & (p_df['Velocity'] < 20) & (p_df['Age_Diff'] > 0.5)]
-                                     if not p_df.empty:
-                                         velocities.append(p_df[['Age', 'Velocity']])
+                         avg_vel = growth_engine.velocity_curve(growth, players=target_players)
                          
-                         if velocities:
-                             vel_df = pd.concat(velocities)
-                             vel_df['Age_Rounded'] = vel_df['Age'].apply(lambda x: round(x * 2) / 2)
-                             avg_vel = vel_df.groupby('Age_Rounded')['Velocity'].mean().reset_index()
-                             
+                         if not avg_vel.empty:
                              fig_vel = px.line(avg_vel, x='Age_Rounded', y='Velocity', markers=True)
                              fig_vel.update_layout(
                                  height=300, margin=dict(t=10, b=10, l=10, r=10),
@@ -631,9 +692,21 @@ def show_dashboard(df):
                              )
                              fig_vel.update_traces(line_color='#1B263B', line_width=3, marker_size=6)
                              
+                             # League-wide reference curve (all players)
+                             league_vel = growth_engine.velocity_curve(growth)
+                             fig_vel.add_trace(go.Scatter(
+                                 x=league_vel['Age_Rounded'], y=league_vel['Velocity'], mode='lines', name='리그 전체',
+                                 line=dict(color='#8D99AE', width=2, dash='dot'), showlegend=False
+                             ))
+                             
                              # Peak Height Velocity Zone
                              fig_vel.add_vrect(x0=13.5, x1=14.5, fillcolor="#EF233C", opacity=0.1, annotation_text="PHV Zone")
                              st.plotly_chart(fig_vel, use_container_width=True, config={'displayModeBar': False})
+                             
+                             phv = growth["phv"]
+                             phv_ages = phv.loc[phv['Player'].isin(target_players), 'PHV_Age']
+                             if not phv_ages.empty:
+                                 st.caption(f"관측 PHV 나이 중앙값: {phv_ages.median():.1f}세 ({len(phv_ages)}명) · 점선: 리그 전체")
                          else:
                              st.info("연속 측정 데이터가 부족하여 성장 속도를 계산할 수 없습니다.")
         
@@ -5,30 +5,20 @@ import plotly.graph_objects as go
 import datetime
 import base64
 import time
-from utils import center_db
-import importlib
+from utils import center_db, cache_namespaces
 from utils.ui_utils import get_base64_of_bin_file
 
-# Force reload DB module to pick up new schema/functions
-importlib.reload(center_db)
-
-# Init DB on load
-center_db.init_db()
-
-# --- One-time Cache Clear for Auth Fix ---
-if 'auth_fix_cleared' not in st.session_state:
-    st.cache_data.clear()
-    st.session_state['auth_fix_cleared'] = True
-    st.rerun()
-
-# --- One-time Cache Clear V2 (For Scope Fix) ---
-if 'scope_fix_cleared' not in st.session_state:
-    st.cache_data.clear()
-    st.session_state['scope_fix_cleared'] = True
-    st.image("https://media.giphy.com/media/l0HlHJGHe3yAMhdQY/giphy.gif", caption="배관 뚫는 중...", width=100)
-    st.rerun()
+# Init DB once per schema version / namespace bump (no module reload, no global cache wipe:
+# auth/scope fixes invalidate only their own loader via utils.cache_namespaces).
+# Called on every page run; the cache makes it a no-op until the token changes.
+@st.cache_resource
+def _init_center_db(namespace):
+    center_db.init_db()
+    return namespace
 
 def show_dashboard(df_raw=None): # df_raw is optional now as we use DB
+    _init_center_db(cache_namespaces.token("center"))
+
     # --- CSS Styling (Same Premium Style) ---
     st.markdown("""
     <style>
@@ -230,8 +220,6 @@ def show_dashboard(df_raw=None): # df_raw is optional now as we use DB
         
         # --- Merge VALD Players ---
         from utils import vald_data_loader
-        import importlib
-        importlib.reload(vald_data_loader) # Force reload to pick up new function
         vald_names = vald_data_loader.get_vald_player_list()
         
         # Add VALD names that aren't already matched (simple string match)
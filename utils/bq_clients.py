@@ -0,0 +1,169 @@
+import os
+import time
+import calendar
+import threading
+import streamlit as st
+
+# Process-wide BigQuery client registry.
+# Each tenant's credentials and bigquery.Client are built once per process and
+# shared by every session/thread, so cache misses reuse the same HTTP connection
+# pool instead of paying TLS + OAuth setup again. A daemon thread refreshes
+# access tokens shortly before they expire.
+
+DEFAULT_SCOPES = [
+    "https://www.googleapis.com/auth/cloud-platform",
+    "https://www.googleapis.com/auth/drive",
+]
+
+TENANTS = {
+    "kleague": {
+        "secrets": ["kleague_service_account"],
+        "key_files": ["service-account-key.json"],
+        "project": None,  # taken from the credentials
+        "scopes": DEFAULT_SCOPES,
+        "allow_default": False,
+    },
+    "ycg": {
+        "secrets": ["ycg_service_account"],
+        "key_files": ["ycg-key.json"],
+        "project": None,  # taken from the credentials
+        "scopes": DEFAULT_SCOPES,
+        "allow_default": True,  # fall back to the default credential chain
+        "default_project": "ycgcenter",  # project for the default credential chain only
+    },
+    "gangwon": {
+        "secrets": ["gcp_service_account", "gangwon_service_account"],
+        "key_files": ["gangwon-key.json", os.path.join("gangwon_fc", "gangwon-key.json")],
+        "project": "gangwonfc",
+        "scopes": DEFAULT_SCOPES + ["https://www.googleapis.com/auth/spreadsheets"],
+        "allow_default": False,
+    },
+}
+
+# Connections kept alive per client (shared across sessions/threads)
+POOL_MAXSIZE = 32
+
+# Refresh tokens this many seconds before expiry; refresher wakes up every REFRESH_INTERVAL
+REFRESH_MARGIN = 300
+REFRESH_INTERVAL = 60
+
+_clients = {}
+_credentials = {}
+_sessions = {}  # tenant -> AuthorizedSession (None with default credentials)
+_lock = threading.Lock()
+_refresher = None
+
+
+def _load_credentials(tenant):
+    """Secrets first (Streamlit Cloud), then local key files. Returns (credentials, source) or (None, None)."""
+    from google.oauth2 import service_account
+
+    conf = TENANTS[tenant]
+    for secret_key in conf["secrets"]:
+        try:
+            if secret_key in st.secrets:
+                key_info = dict(st.secrets[secret_key])
+                return service_account.Credentials.from_service_account_info(key_info, scopes=conf["scopes"]), secret_key
+        except Exception as e:
+            print(f"[{tenant}] Secret '{secret_key}' load failed: {e}")
+
+    for path in conf["key_files"]:
+        if os.path.exists(path):
+            try:
+                return service_account.Credentials.from_service_account_file(path, scopes=conf["scopes"]), path
+            except Exception as e:
+                print(f"[{tenant}] Key file '{path}' load failed: {e}")
+    return None, None
+
+
+def _build_client(tenant):
+    from google.cloud import bigquery
+    from google.auth.transport.requests import AuthorizedSession
+    from requests.adapters import HTTPAdapter
+
+    conf = TENANTS[tenant]
+    credentials, source = _load_credentials(tenant)
+
+    if credentials is None:
+        if not conf["allow_default"]:
+            try:
+                found_keys = list(st.secrets.keys())
+            except Exception:
+                found_keys = []
+            raise FileNotFoundError(
+                f"인증 실패: '{conf['secrets'][0]}' 키가 Secrets에 없습니다. 현재 등록된 키: {found_keys}"
+            )
+        print(f"[{tenant}] No service account found, using default credentials")
+        return bigquery.Client(project=conf["project"] or conf.get("default_project")), None, None
+
+    # One pooled, authorized HTTP session per tenant (thread-safe, keep-alive)
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=POOL_MAXSIZE, pool_maxsize=POOL_MAXSIZE)
+    session.mount("https://", adapter)
+
+    project = conf["project"] or credentials.project_id
+    print(f"[{tenant}] BigQuery client created from {source}")
+    return bigquery.Client(credentials=credentials, project=project, _http=session), credentials, session
+
+
+def _refresh_loop():
+    from google.auth.transport.requests import Request
+
+    request = Request()
+    while True:
+        time.sleep(REFRESH_INTERVAL)
+        for tenant, credentials in list(_credentials.items()):
+            # expiry is a naive UTC datetime (None before the first token is fetched)
+            expiry = getattr(credentials, "expiry", None)
+            expires_in = calendar.timegm(expiry.timetuple()) - time.time() if expiry else 0
+            if not credentials.valid or expires_in < REFRESH_MARGIN:
+                try:
+                    credentials.refresh(request)
+                except Exception as e:
+                    print(f"[{tenant}] Background token refresh failed: {e}")
+
+
+def _ensure_refresher():
+    global _refresher
+    if _refresher is None or not _refresher.is_alive():
+        _refresher = threading.Thread(target=_refresh_loop, name="bq-token-refresher", daemon=True)
+        _refresher.start()
+
+
+def get_client(tenant):
+    """
+    Returns the shared bigquery.Client for a tenant ('kleague', 'ycg', 'gangwon'),
+    building it on first use. Raises FileNotFoundError if no credentials are configured.
+    """
+    client = _clients.get(tenant)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(tenant)
+        if client is None:
+            client, credentials, session = _build_client(tenant)
+            _clients[tenant] = client
+            _sessions[tenant] = session
+            if credentials is not None:
+                _credentials[tenant] = credentials
+                _ensure_refresher()
+        return client
+
+
+def get_session(tenant):
+    """
+    The tenant's pooled, authorized HTTP session (same credentials and scopes as its
+    BigQuery client, e.g. for Drive metadata calls), or None with default credentials.
+    """
+    get_client(tenant)
+    return _sessions.get(tenant)
+
+
+def reset_client(tenant=None):
+    """Drops cached clients (e.g. after rotating a key) so the next call rebuilds them."""
+    with _lock:
+        for t in ([tenant] if tenant else list(_clients)):
+            _clients.pop(t, None)
+            _credentials.pop(t, None)
+            _sessions.pop(t, None)
@@ -0,0 +1,63 @@
+import weakref
+import threading
+
+# Shared result fetching for all BigQuery loaders (K League, YCG VALD, Gangwon).
+# Results are streamed as Arrow record batches through the BigQuery Storage Read
+# API and converted to pandas in one pass. REST paging is only used when the
+# storage module is missing or the read session fails.
+
+_storage_clients = weakref.WeakKeyDictionary()
+_storage_lock = threading.Lock()
+_storage_available = None
+
+
+def _get_storage_client(client):
+    """One BigQueryReadClient (gRPC channel) per bigquery.Client, created lazily."""
+    global _storage_available
+    if _storage_available is False:
+        return None
+
+    with _storage_lock:
+        if client in _storage_clients:
+            return _storage_clients[client]
+        try:
+            from google.cloud import bigquery_storage
+            read_client = bigquery_storage.BigQueryReadClient(credentials=client._credentials)
+            _storage_available = True
+        except ImportError:
+            print("BigQuery Storage module not found, using the REST endpoint (pip install google-cloud-bigquery-storage)")
+            _storage_available = False
+            return None
+        except Exception as e:
+            print(f"BigQuery Storage client init failed, using REST: {e}")
+            return None
+        _storage_clients[client] = read_client
+        return read_client
+
+
+def arrow_to_dataframe(table):
+    """
+    Arrow table -> pandas. Numeric/timestamp columns become numpy dtypes,
+    strings stay object (what the dashboards expect), DATE stays datetime.date.
+    split_blocks/self_destruct avoid holding two copies of large results.
+    """
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def query_to_dataframe(client, query, job_config=None):
+    """
+    Runs `query` and returns the result as a DataFrame (Arrow fast path, REST fallback).
+    Drop-in replacement for client.query(query).to_dataframe().
+    """
+    query_job = client.query(query, job_config=job_config)
+    rows = query_job.result()
+    read_client = _get_storage_client(client)
+
+    if read_client is not None:
+        try:
+            return arrow_to_dataframe(rows.to_arrow(bqstorage_client=read_client))
+        except Exception as e:
+            print(f"Storage read failed, falling back to REST: {e}")
+            rows = query_job.result()
+
+    return arrow_to_dataframe(rows.to_arrow(create_bqstorage_client=False))
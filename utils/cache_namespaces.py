@@ -0,0 +1,41 @@
+import threading
+
+# Versioned cache namespaces, one per loader.
+# Every cache key a loader produces (in-memory st.cache_*, refresh scheduler,
+# player LRU, disk tier) includes its namespace token, so invalidating one
+# loader never touches another tenant's entries - unlike st.cache_data.clear(),
+# which wipes the whole process.
+#   - Schema / scope / credential changes: bump the loader's entry below; its
+#     disk and memory entries are rebuilt after the deploy, the others are kept.
+#   - At runtime: bump(name) invalidates that namespace in this process.
+
+NAMESPACE_VERSIONS = {
+    "kleague": 1,
+    "vald": 2,      # 2: service-account scope fix (replaces the global cache wipes in template_center)
+    "gangwon": 2,   # 2: team frame stored with datetime64 Test_Date, sorted by date
+    "center": 1,    # SQLite schema (center_db.init_db)
+}
+
+_generations = {}  # name -> runtime bump count
+_lock = threading.Lock()
+
+
+def token(name):
+    """Current namespace token, e.g. 'vald:v2.0'."""
+    with _lock:
+        generation = _generations.get(name, 0)
+    return f"{name}:v{NAMESPACE_VERSIONS.get(name, 1)}.{generation}"
+
+
+def key(name, version):
+    """Namespaced cache key for a source data version (None stays None: version unknown)."""
+    if version is None:
+        return None
+    return f"{token(name)}|{version}"
+
+
+def bump(name):
+    """Invalidates every cache entry of one namespace in this process."""
+    with _lock:
+        _generations[name] = _generations.get(name, 0) + 1
+    print(f"[cache] namespace {name} bumped to {token(name)}")
@@ -0,0 +1,99 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Process-level cache warm-up.
+# Started once per server process: Home.py and every page call start() before
+# their login gate, so the first script run of the process starts it and every
+# later call is a no-op. A daemon thread loads every tenant dataset in
+# parallel through the regular cached loaders, so the first real page view is
+# a cache hit. This module is a thin launcher: it imports nothing heavy, and the
+# loaders (pandas, BigQuery, plotly) are imported inside the worker thread, so the
+# login form renders without waiting on them. Loaders are single-flight, so a page that
+# asks for a dataset still being warmed waits on that fetch instead of
+# starting a second one.
+
+_status = {}  # task -> {"state": pending|running|done|failed, "seconds", "error"}
+_lock = threading.Lock()
+_thread = None
+
+
+def _warm_kleague():
+    # Every K League view's column set, so any first tab is already prepared
+    from utils import data_loader
+    from templates.template_association import VIEW_COLUMNS
+
+    for columns in dict.fromkeys(VIEW_COLUMNS.values()):
+        data_loader.load_prepared(
+            data_loader.KLEAGUE_PROJECT, data_loader.KLEAGUE_DATASET, data_loader.KLEAGUE_TABLE,
+            columns=columns
+        )
+
+
+def _warm_gangwon():
+    from gangwon_fc.utils import gangwon_data_loader
+    store = gangwon_data_loader.get_team_store()
+    if store["error"]:
+        raise RuntimeError(store["error"])
+
+
+def _warm_vald():
+    from utils import vald_data_loader
+    from utils import refresh_scheduler
+    refresh_scheduler.get("vald")
+    vald_data_loader.get_vald_player_list()
+
+
+WARM_TASKS = {
+    "K League measurements": _warm_kleague,
+    "Gangwon vald_all_data": _warm_gangwon,
+    "YCG VALD tables": _warm_vald,
+}
+
+
+def _set(task, **fields):
+    with _lock:
+        _status[task].update(fields)
+
+
+def _run_task(task, fn):
+    _set(task, state="running")
+    started = time.time()
+    try:
+        fn()
+        _set(task, state="done", seconds=round(time.time() - started, 1))
+        print(f"[warmup] {task}: done in {time.time() - started:.1f}s")
+    except Exception as e:
+        _set(task, state="failed", seconds=round(time.time() - started, 1), error=str(e))
+        print(f"[warmup] {task}: failed: {e}")
+
+
+def _run():
+    with ThreadPoolExecutor(max_workers=len(WARM_TASKS)) as pool:
+        for task, fn in WARM_TASKS.items():
+            pool.submit(_run_task, task, fn)
+
+
+def start():
+    """Starts the background warm-up once per process. Returns immediately."""
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return
+        for task in WARM_TASKS:
+            _status[task] = {"state": "pending", "seconds": None, "error": None}
+        _thread = threading.Thread(target=_run, name="cache-warmup", daemon=True)
+    _thread.start()
+
+
+def progress():
+    """{task: status} copy plus overall counts, for display."""
+    with _lock:
+        tasks = {task: dict(status) for task, status in _status.items()}
+    finished = sum(1 for s in tasks.values() if s["state"] in ("done", "failed"))
+    return {"finished": finished, "total": len(WARM_TASKS), "tasks": tasks}
+
+
+def is_complete():
+    p = progress()
+    return p["total"] > 0 and p["finished"] == p["total"]
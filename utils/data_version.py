@@ -0,0 +1,104 @@
+import re
+import time
+import threading
+from utils import bq_clients
+
+# Source data-version probes used as cache keys by the loaders.
+# Instead of refetching blindly every ttl seconds, a loader passes the current
+# version of its source table(s) into its cached function: the cached frame is
+# reused until the version changes, and a coach's edit shows up on the next
+# probe instead of up to ten minutes later.
+#   native tables   - table.modified + num_rows (metadata call, no query job)
+#   external tables - Drive version / modifiedTime of the source sheet(s)
+#                     (Google Sheets sources do not update `modified`; one
+#                     metadata call per file, no query job). If the file
+#                     metadata is unavailable the token changes every
+#                     EXTERNAL_TTL seconds, i.e. TTL-based staleness.
+# Probes are rate-limited per table to one every PROBE_INTERVAL seconds.
+
+PROBE_INTERVAL = 60
+
+# Staleness accepted for external tables whose source file metadata cannot be read
+EXTERNAL_TTL = 600
+
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files/{}"
+_SHEET_ID_RE = re.compile(r"/spreadsheets/d/([A-Za-z0-9_-]+)")
+
+_versions = {}  # table_ref -> (checked_at, version)
+_lock = threading.Lock()
+
+
+def _drive_version(session, uris):
+    """'version@modifiedTime' of every Sheets file behind an external table, or None."""
+    parts = []
+    for uri in uris:
+        match = _SHEET_ID_RE.search(uri)
+        if not match:
+            return None
+        resp = session.get(DRIVE_FILES_URL.format(match.group(1)),
+                           params={"fields": "version,modifiedTime", "supportsAllDrives": "true"}, timeout=10)
+        resp.raise_for_status()
+        meta = resp.json()
+        parts.append(f"{meta.get('version')}@{meta.get('modifiedTime')}")
+    return ",".join(parts) or None
+
+
+def probe(client, table_ref, session=None):
+    """
+    Current version token of a table (string). Metadata calls only (no query job);
+    always hits the APIs - see current_version.
+    """
+    table = client.get_table(table_ref)
+    if table.table_type != "EXTERNAL":
+        modified = table.modified.timestamp() if table.modified else None
+        return f"{modified}:{table.num_rows}"
+
+    config = table.external_data_configuration
+    uris = list(config.source_uris or []) if config is not None else []
+    if session is not None and uris:
+        try:
+            version = _drive_version(session, uris)
+            if version:
+                return f"drive:{version}"
+        except Exception as e:
+            print(f"Drive metadata unavailable for {table_ref}: {e}")
+    # No file metadata: accept up to EXTERNAL_TTL seconds of staleness
+    return f"ttl:{int(time.time() // EXTERNAL_TTL)}"
+
+
+def current_version(tenant, table_ref, max_age=PROBE_INTERVAL):
+    """
+    Version token of `table_ref`, probed at most once per `max_age` seconds per process.
+    If the probe fails the last known version is kept (None if never probed),
+    so a BigQuery outage does not invalidate the cached frames.
+    """
+    with _lock:
+        checked_at, version = _versions.get(table_ref, (0, None))
+    if time.time() - checked_at < max_age:
+        return version
+
+    try:
+        version = probe(bq_clients.get_client(tenant), table_ref, bq_clients.get_session(tenant))
+    except Exception as e:
+        print(f"Version probe failed for {table_ref}: {e}")
+
+    with _lock:
+        _versions[table_ref] = (time.time(), version)
+    return version
+
+
+def combined_version(tenant, table_refs, max_age=PROBE_INTERVAL):
+    """Single token for several tables (changes when any of them changes); None if any is unknown."""
+    versions = [current_version(tenant, ref, max_age) for ref in table_refs]
+    if any(v is None for v in versions):
+        return None
+    return "|".join(versions)
+
+
+def invalidate(table_ref=None):
+    """Forces the next current_version() call to probe again."""
+    with _lock:
+        if table_ref is None:
+            _versions.clear()
+        else:
+            _versions.pop(table_ref, None)
@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import glob
+import hashlib
+import pandas as pd
+
+# Disk tier under the in-memory loader caches.
+# Streamlit Cloud restarts the app often and every in-memory cache is lost.
+# Loaders save the frames they fetched here (zstd-compressed Parquet + JSON
+# manifest), tagged with the source data version (utils.data_version). After a
+# restart the loader probes the version and, if it matches, rehydrates from
+# disk instead of re-running the BigQuery jobs. Only the latest version of each
+# dataset is kept.
+LOADER_CACHE_DIR = os.path.join(".cache", "loaders")
+
+COMPRESSION = "zstd"
+
+# Bump when the on-disk layout changes; older entries are ignored
+DISK_CACHE_FORMAT = 1
+
+
+def _dataset_dir(name):
+    return os.path.join(LOADER_CACHE_DIR, name)
+
+
+def _version_tag(version):
+    return hashlib.sha1(str(version).encode("utf-8")).hexdigest()[:16]
+
+
+def load_frames(name, version):
+    """
+    Returns ({key: DataFrame}, meta) saved for `version`, or (None, None).
+    With version=None (source unreachable) the latest saved entry is returned.
+    """
+    manifest_path = os.path.join(_dataset_dir(name), "manifest.json")
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+
+    if manifest.get("format") != DISK_CACHE_FORMAT:
+        return None, None
+    if version is not None and manifest.get("version") != str(version):
+        return None, None
+
+    try:
+        frames = {
+            key: pd.read_parquet(os.path.join(_dataset_dir(name), filename))
+            for key, filename in manifest["frames"].items()
+        }
+    except Exception as e:
+        print(f"Disk cache read failed for {name}: {e}")
+        return None, None
+    print(f"[disk-cache] {name}: rehydrated version {manifest.get('version')} from disk")
+    return frames, manifest.get("meta", {})
+
+
+def save_frames(name, version, frames, meta=None):
+    """
+    Persists {key: DataFrame} for `version` (atomic: files first, manifest last) and
+    removes files of older versions. Entries without a known version are not saved.
+    """
+    if version is None:
+        return
+    base = _dataset_dir(name)
+    tag = _version_tag(version)
+    try:
+        os.makedirs(base, exist_ok=True)
+        files = {}
+        for i, (key, df) in enumerate(frames.items()):
+            filename = f"{tag}.{i}.parquet"
+            path = os.path.join(base, filename)
+            df.reset_index(drop=True).to_parquet(path + ".tmp", index=False, compression=COMPRESSION)
+            os.replace(path + ".tmp", path)
+            files[key] = filename
+
+        manifest = {
+            "format": DISK_CACHE_FORMAT,
+            "version": str(version),
+            "frames": files,
+            "meta": meta or {},
+            "saved_at": time.time(),
+        }
+        manifest_path = os.path.join(base, "manifest.json")
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+        for path in glob.glob(os.path.join(base, "*.parquet")):
+            if not os.path.basename(path).startswith(tag + "."):
+                os.remove(path)
+    except Exception as e:
+        # e.g. mixed-type object columns Arrow cannot encode; the in-memory cache still works
+        print(f"Disk cache write failed for {name}: {e}")
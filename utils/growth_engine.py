@@ -0,0 +1,95 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+
+# Longitudinal growth engine for the K League maturity tab.
+# Height / weight velocities of every player are computed in one grouped,
+# vectorized pass (sort once, diff within player) instead of a Python loop per
+# player, together with each player's observed peak-height-velocity (PHV) age.
+# Results are cached per data version of the prepared frame (df.attrs['data_version']),
+# so the maturity tab only filters precomputed tables on rerun.
+
+# Velocities over intervals shorter than this (years) are too noisy to use
+MIN_INTERVAL_YEARS = 0.5
+# Plausible height velocity range (cm/year); outside it the interval is discarded
+HEIGHT_VELOCITY_RANGE = (0, 20)
+
+
+def compute_growth(df, player_col='Player'):
+    """
+    Returns {"velocities": DataFrame, "phv": DataFrame}:
+        velocities: one row per usable interval between consecutive measurements of a player
+            [player_col, Age, Age_Mid, Age_Rounded, Velocity (cm/yr), Weight_Velocity (kg/yr)]
+            Age is the age at the later measurement, Age_Rounded is Age to 0.5 years.
+        phv: per player, the interval with the highest height velocity
+            [player_col, PHV_Age (interval midpoint), PHV_Velocity]
+    """
+    empty = {
+        "velocities": pd.DataFrame(columns=[player_col, 'Age', 'Age_Mid', 'Age_Rounded', 'Velocity', 'Weight_Velocity']),
+        "phv": pd.DataFrame(columns=[player_col, 'PHV_Age', 'PHV_Velocity']),
+    }
+    if df.empty or not {player_col, 'Age', 'Height'}.issubset(df.columns):
+        return empty
+
+    cols = [player_col, 'Age', 'Height'] + (['Weight'] if 'Weight' in df.columns else [])
+    hist = df[cols].dropna(subset=[player_col, 'Age'])
+    hist = hist.sort_values([player_col, 'Age'], kind='stable')
+    group = hist.groupby(player_col, observed=True, sort=False)
+
+    age = hist['Age'].to_numpy(dtype=float)
+    age_diff = group['Age'].diff().to_numpy(dtype=float)
+    h_vel = group['Height'].diff().to_numpy(dtype=float) / np.where(age_diff > 0, age_diff, np.nan)
+    if 'Weight' in hist.columns:
+        w_vel = group['Weight'].diff().to_numpy(dtype=float) / np.where(age_diff > 0, age_diff, np.nan)
+    else:
+        w_vel = np.full(len(hist), np.nan)
+
+    lo, hi = HEIGHT_VELOCITY_RANGE
+    keep = (age_diff > MIN_INTERVAL_YEARS) & (h_vel > lo) & (h_vel < hi)
+    if not keep.any():
+        return empty
+
+    velocities = pd.DataFrame({
+        player_col: hist[player_col].to_numpy()[keep],
+        'Age': age[keep],
+        'Age_Mid': (age - age_diff / 2)[keep],
+        'Age_Rounded': np.round(age[keep] * 2) / 2,
+        'Velocity': h_vel[keep],
+        'Weight_Velocity': w_vel[keep],
+    })
+
+    # Peak per player: highest velocity last after a stable sort, keep the last row per player
+    peaks = velocities.sort_values('Velocity', kind='stable').drop_duplicates(player_col, keep='last')
+    phv = pd.DataFrame({
+        player_col: peaks[player_col].to_numpy(),
+        'PHV_Age': peaks['Age_Mid'].to_numpy(),
+        'PHV_Velocity': peaks['Velocity'].to_numpy(),
+    }).sort_values(player_col, kind='stable').reset_index(drop=True)
+    return {"velocities": velocities, "phv": phv}
+
+
+def get_growth(df, player_col='Player'):
+    """
+    compute_growth(df), cached per data version of the prepared frame (shared, read-only).
+    Frames without a data version are computed directly.
+    """
+    version = df.attrs.get('data_version')
+    if version is None:
+        return compute_growth(df, player_col)
+    present = tuple(c for c in (player_col, 'Age', 'Height', 'Weight') if c in df.columns)
+    return _cached_growth(version, present, len(df), player_col, df)
+
+
+@st.cache_resource(max_entries=4)
+def _cached_growth(version, present, n_rows, player_col, _df):
+    # _df is not hashed; (version, columns present, row count) identify it
+    return compute_growth(_df, player_col)
+
+
+def velocity_curve(growth, players=None, value='Velocity', player_col='Player'):
+    """Mean velocity per 0.5-year age bin [Age_Rounded, value], optionally for a set of players."""
+    vel = growth["velocities"]
+    if players is not None:
+        vel = vel[vel[player_col].isin(players)]
+    vel = vel.dropna(subset=[value])
+    return vel.groupby('Age_Rounded')[value].mean().reset_index()
@@ -0,0 +1,81 @@
+import pandas as pd
+
+# Declarative dtype registry for the K League `measurements` table.
+# safe_schema.sql declares most metrics as STRING (sheet values can be dirty),
+# so every column gets its final compact dtype once, when the table is loaded:
+#   float32   - measurements / scores (bad cells -> NaN)
+#   Int32     - integer ids and counters (nullable)
+#   category  - low-cardinality labels used for filters and grouping
+#   datetime  - dates (datetime64[ns])
+#   string    - free text, kept as object
+# Columns not listed here are left untouched.
+
+CATEGORY_COLUMNS = ['Test_ID', 'Team', 'Grade', 'Position', 'Under', 'Maturity']
+DATETIME_COLUMNS = ['Date', 'Birth_Date', 'Birth_date']
+INT_COLUMNS = ['Player_ID', 'Year', 'Days']
+STRING_COLUMNS = ['Player', 'Name', 'Birth_Year']
+
+FLOAT_COLUMNS = [
+    # Body / maturity
+    'Age', 'Height', 'Weight', 'Sitting', 'Maturity_Offset', 'APHV',
+    # Strength (N)
+    'HamECC_L_N_', 'HamECC_R_N_', 'HipAdd_L_N_', 'HipAdd_R_N_', 'HipAbd_L_N_', 'HipAbd_R_N_',
+    'ShoulderIR_L_N_', 'ShoulderIR_R_N_', 'ShoulderER_L_N_', 'ShoulderER_R_N_',
+    'Ham', 'Add', 'Abd', 'Flex', 'Strength_Sum',
+    # Speed / agility (sec)
+    '_5m_sec_', '_10m_sec_', '_30m_sec_', 'COD_sec_', 'COD_ball_sec_',
+    # Power
+    'CMJ_Height_cm_', 'CMJ_TakeoffConcentricPeakForce_N_', 'CMRJ_RSI', 'SquatJ_Height_cm_', 'IMTP_N_',
+    'EUR_CMJ_SquatJ_', 'DSI_CMJ_IMTP_',
+]
+
+SCHEMA = {}
+SCHEMA.update({c: 'category' for c in CATEGORY_COLUMNS})
+SCHEMA.update({c: 'datetime' for c in DATETIME_COLUMNS})
+SCHEMA.update({c: 'Int32' for c in INT_COLUMNS})
+SCHEMA.update({c: 'string' for c in STRING_COLUMNS})
+SCHEMA.update({c: 'float32' for c in FLOAT_COLUMNS})
+
+
+def dtype_for(col):
+    """Registered kind for a column. All 10-point score columns (*Point*) are float32."""
+    if col in SCHEMA:
+        return SCHEMA[col]
+    if 'Point' in col:
+        return 'float32'
+    return None
+
+
+def _convert(s, kind):
+    if kind == 'float32':
+        if s.dtype == 'float32':
+            return s
+        return pd.to_numeric(s, errors='coerce').astype('float32')
+    if kind == 'Int32':
+        if str(s.dtype) == 'Int32':
+            return s
+        return pd.to_numeric(s, errors='coerce').round().astype('Int32')
+    if kind == 'datetime':
+        if pd.api.types.is_datetime64_any_dtype(s):
+            return s
+        return pd.to_datetime(s, errors='coerce')
+    if kind == 'category':
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            return s
+        # Labels are compared as strings everywhere (Test_ID '24_1', Under '15', ...)
+        return s.where(s.isna(), s.astype(str)).astype('category')
+    if kind == 'string':
+        return s if s.dtype == object else s.astype(object)
+    return s
+
+
+def apply_schema(df):
+    """
+    Casts every registered column to its compact dtype (in place on `df`, also returned).
+    Idempotent: already-typed columns are skipped, so it is cheap to call again.
+    """
+    for col in df.columns:
+        kind = dtype_for(col)
+        if kind:
+            df[col] = _convert(df[col], kind)
+    return df
@@ -0,0 +1,93 @@
+import sys
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+# Memory-budgeted LRU caches for per-player results.
+# st.cache_data keeps one entry per distinct player name with no size bound;
+# on a long-running server browsing hundreds of players grows memory without
+# limit. A PlayerLRU holds entries up to a byte budget (DataFrames measured with
+# memory_usage(deep=True)) and evicts the least recently used ones. Cached
+# values are shared between sessions - treat them as read-only.
+
+_caches = {}  # name -> PlayerLRU (for stats display)
+_registry_lock = threading.Lock()
+
+
+def sizeof(value):
+    """Approximate in-memory size in bytes of a DataFrame / Series / dict / list of them."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class PlayerLRU:
+    """Thread-safe LRU keyed by (player key, data version) with a total byte budget."""
+
+    def __init__(self, name, max_bytes):
+        self.name = name
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        with _registry_lock:
+            _caches[name] = self
+
+    def get_or_load(self, key, load, *args, **kwargs):
+        """Cached value for `key`, or load(*args, **kwargs) stored under it."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = load(*args, **kwargs)
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        nbytes = sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return  # larger than the whole budget: serve it, don't keep it
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def stats():
+    """{cache name: counters} for every PlayerLRU in the process."""
+    with _registry_lock:
+        caches = list(_caches.values())
+    return {c.name: c.stats() for c in caches}
@@ -0,0 +1,180 @@
+import re
+import datetime
+from collections import namedtuple
+from utils import bq_fetch
+
+# Safe, parameterized SELECT builder shared by the loaders (K League, YCG VALD, Gangwon).
+# Identifiers are validated and backtick-quoted; every filter value is bound as a
+# query parameter, never formatted into the SQL text. Specs are plain hashable
+# values, so a (table, version, spec) tuple can be used as a cache key.
+#
+#   filters:    {column: value}          value: scalar  -> column = @p
+#                                               list/tuple/set -> column IN UNNEST(@p)
+#                                               Between(lo, hi) -> column BETWEEN @lo AND @hi
+#                                               Contains(text)  -> substring match
+#   aggregates: {alias: (FUNC, column)}  FUNC in AGG_FUNCS; numeric aggregates use SAFE_CAST
+#   order_by:   [column | (column, "ASC" | "DESC")]
+# String values are compared on CAST(column AS STRING): the K League sheet columns
+# are declared STRING and labels such as Test_ID '24_1' are strings everywhere.
+
+Between = namedtuple("Between", ["low", "high"])
+Contains = namedtuple("Contains", ["text"])
+
+# COUNT_NUM counts values that parse as numbers (the denominator matching SUM/AVG)
+AGG_FUNCS = {"AVG", "SUM", "MIN", "MAX", "COUNT", "COUNT_NUM"}
+
+# Anything BigQuery accepts as a flexible column name, minus quoting/escape characters
+_IDENT_RE = re.compile(r"^[^`\\\x00-\x1f]{1,300}$")
+_TABLE_RE = re.compile(r"^[A-Za-z0-9_\-]+(\.[A-Za-z0-9_\-]+){1,2}$")
+
+
+def quote_ident(name):
+    """`name`, or ValueError if it cannot be a column name."""
+    if not isinstance(name, str) or not _IDENT_RE.match(name):
+        raise ValueError(f"Invalid column name: {name!r}")
+    return f"`{name}`"
+
+
+def quote_table(table_ref):
+    if not _TABLE_RE.match(table_ref or ""):
+        raise ValueError(f"Invalid table reference: {table_ref!r}")
+    return f"`{table_ref}`"
+
+
+def _param_type(value):
+    if isinstance(value, bool):
+        return "BOOL"
+    if isinstance(value, int):
+        return "INT64"
+    if isinstance(value, float):
+        return "FLOAT64"
+    if isinstance(value, datetime.datetime):
+        return "TIMESTAMP"
+    if isinstance(value, datetime.date):
+        return "DATE"
+    if isinstance(value, str):
+        return "STRING"
+    raise ValueError(f"Unsupported filter value: {value!r}")
+
+
+def _column_expr(column, value):
+    """STRING values compare on the column cast to STRING; other types compare natively."""
+    col = quote_ident(column)
+    return f"CAST({col} AS STRING)" if isinstance(value, str) else col
+
+
+def _filter_sql(column, cond, params):
+    """Appends the parameters for one filter and returns its SQL predicate."""
+    def bind(value):
+        name = f"p{len(params)}"
+        params.append(("scalar", name, _param_type(value), value))
+        return f"@{name}"
+
+    if isinstance(cond, Between):
+        probe = cond.low if cond.low is not None else cond.high
+        col = _column_expr(column, probe)
+        parts = []
+        if cond.low is not None:
+            parts.append(f"{col} >= {bind(cond.low)}")
+        if cond.high is not None:
+            parts.append(f"{col} <= {bind(cond.high)}")
+        return " AND ".join(parts) or "TRUE"
+
+    if isinstance(cond, Contains):
+        return f"STRPOS(CAST({quote_ident(column)} AS STRING), {bind(str(cond.text))}) > 0"
+
+    if isinstance(cond, (list, tuple, set, frozenset)):
+        values = sorted(cond, key=str)
+        if not values:
+            return "FALSE"
+        name = f"p{len(params)}"
+        params.append(("array", name, _param_type(values[0]), values))
+        return f"{_column_expr(column, values[0])} IN UNNEST(@{name})"
+
+    if cond is None:
+        return f"{quote_ident(column)} IS NULL"
+    return f"{_column_expr(column, cond)} = {bind(cond)}"
+
+
+def _aggregate_sql(alias, func, column):
+    func = func.upper()
+    if func not in AGG_FUNCS:
+        raise ValueError(f"Unsupported aggregate: {func}")
+    if func == "COUNT_NUM":
+        expr = f"COUNTIF(SAFE_CAST({quote_ident(column)} AS FLOAT64) IS NOT NULL)"
+    elif func == "COUNT":
+        expr = "COUNT(*)" if column == "*" else f"COUNT({quote_ident(column)})"
+    elif func in ("MIN", "MAX"):
+        expr = f"{func}({quote_ident(column)})"
+    else:
+        expr = f"{func}(SAFE_CAST({quote_ident(column)} AS FLOAT64))"
+    return f"{expr} AS {quote_ident(alias)}"
+
+
+def normalize_filters(filters):
+    """{column: cond} -> sorted tuple of (column, cond): hashable and independent of dict order."""
+    if not filters:
+        return ()
+    items = []
+    for column, cond in dict(filters).items():
+        if isinstance(cond, (list, set, frozenset)):
+            cond = tuple(sorted(cond, key=str))
+        items.append((column, cond))
+    return tuple(sorted(items, key=lambda kv: kv[0]))
+
+
+def build_select(table_ref, columns=None, filters=None, group_by=None, aggregates=None,
+                 order_by=None, distinct=False, limit=None):
+    """
+    Returns (sql, params) where params is a list of ("scalar" | "array", name, type, value).
+    Use to_job_config(params) to turn them into a bigquery.QueryJobConfig.
+    """
+    params = []
+    group_by = list(group_by or [])
+    select = []
+    if columns is None and not group_by and not aggregates:
+        select.append("*")
+    select += [quote_ident(c) for c in (columns or []) if c not in group_by]
+    select += [quote_ident(c) for c in group_by]
+    select += [_aggregate_sql(alias, func, col) for alias, (func, col) in (aggregates or {}).items()]
+
+    sql = f"SELECT {'DISTINCT ' if distinct else ''}{', '.join(select)} FROM {quote_table(table_ref)}"
+
+    predicates = [_filter_sql(col, cond, params) for col, cond in normalize_filters(filters)]
+    if predicates:
+        sql += " WHERE " + " AND ".join(predicates)
+    if group_by:
+        sql += " GROUP BY " + ", ".join(quote_ident(c) for c in group_by)
+
+    if order_by:
+        terms = []
+        for item in order_by:
+            col, direction = (item, "ASC") if isinstance(item, str) else item
+            if direction.upper() not in ("ASC", "DESC"):
+                raise ValueError(f"Invalid sort direction: {direction}")
+            terms.append(f"{quote_ident(col)} {direction.upper()}")
+        sql += " ORDER BY " + ", ".join(terms)
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    return sql, params
+
+
+def to_job_config(params):
+    """bigquery.QueryJobConfig for build_select() params (None if there are none)."""
+    if not params:
+        return None
+    from google.cloud import bigquery
+
+    query_parameters = []
+    for kind, name, type_, value in params:
+        if kind == "array":
+            query_parameters.append(bigquery.ArrayQueryParameter(name, type_, list(value)))
+        else:
+            query_parameters.append(bigquery.ScalarQueryParameter(name, type_, value))
+    return bigquery.QueryJobConfig(query_parameters=query_parameters)
+
+
+def run(client, table_ref, **spec):
+    """build_select(table_ref, **spec) executed through utils.bq_fetch. Returns a DataFrame."""
+    sql, params = build_select(table_ref, **spec)
+    return bq_fetch.query_to_dataframe(client, sql, job_config=to_job_config(params))
@@ -0,0 +1,178 @@
+import time
+import datetime
+import threading
+from utils import single_flight
+
+# Stale-while-revalidate refresh scheduler for the dataset loaders.
+# A registered dataset is built once (blocking only the very first caller);
+# after that get() always returns the last good value immediately, and a
+# daemon thread re-checks each dataset every `interval` seconds while it is
+# being read: it probes the source version and rebuilds only when the version
+# changed. Datasets nobody read since their last check are left alone (a read
+# of a stale one starts the check right away). Page latency no longer depends
+# on BigQuery query time, and a failed refresh keeps serving the previous value.
+# A failed first build is remembered for FAILURE_COOLDOWN seconds: callers get
+# the same error instead of re-running the build on every call.
+#
+#   build(version, previous) -> value   (previous: last good value or None)
+#   version() -> token                  (optional; without it every tick rebuilds)
+
+# Seconds between refresh checks per dataset (version probes are also rate-limited
+# by utils.data_version, so intervals below its PROBE_INTERVAL add nothing)
+REFRESH_INTERVALS = {
+    "kleague": 120,
+    "gangwon": 60,
+    "vald": 120,
+}
+DEFAULT_INTERVAL = 120
+
+# How often the scheduler thread looks for due datasets
+TICK_SECONDS = 5
+
+# Seconds a failed first build is re-raised before it is attempted again
+FAILURE_COOLDOWN = 60
+
+_datasets = {}  # name -> entry dict
+_lock = threading.Lock()
+_ticker = None
+
+
+def register(name, build, version=None, interval=None):
+    """Registers a dataset (idempotent: a second call with the same name is ignored)."""
+    with _lock:
+        if name in _datasets:
+            return
+        _datasets[name] = {
+            "build": build,
+            "version_fn": version,
+            "interval": interval or REFRESH_INTERVALS.get(name, DEFAULT_INTERVAL),
+            "has_value": False,
+            "value": None,
+            "version": None,
+            "as_of": None,        # last time the value was confirmed current
+            "checked_at": 0,
+            "refreshing": False,
+            "error": None,
+            "last_access": 0,
+            "failure": None,      # exception of the last failed first build
+            "failed_at": 0,
+        }
+    _ensure_ticker()
+
+
+def _refresh(name):
+    """Probes the version and rebuilds if needed. Raises if the build fails."""
+    entry = _datasets[name]
+    version = entry["version_fn"]() if entry["version_fn"] else None
+    now = time.time()
+
+    if entry["has_value"] and entry["version_fn"] and version is not None and version == entry["version"]:
+        entry.update(checked_at=now, as_of=now, error=None)
+        return
+
+    started = time.time()
+    value = entry["build"](version, entry["value"] if entry["has_value"] else None)
+    entry.update(value=value, version=version, has_value=True, checked_at=now, as_of=now, error=None)
+    print(f"[refresh] {name}: rebuilt (version {version}) in {time.time() - started:.1f}s")
+
+
+def _background_refresh(name):
+    entry = _datasets[name]
+    try:
+        single_flight.do("refresh", name, _refresh, name)
+    except Exception as e:
+        # Keep serving the last good value; try again next interval
+        entry.update(checked_at=time.time(), error=str(e))
+        print(f"[refresh] {name}: refresh failed, serving previous data: {e}")
+    finally:
+        entry["refreshing"] = False
+
+
+def _is_due(entry, now):
+    """Has a value, was read since its last check and that check is older than the interval."""
+    return (entry["has_value"] and not entry["refreshing"]
+            and entry["last_access"] > entry["checked_at"]
+            and now - entry["checked_at"] >= entry["interval"])
+
+
+def _start_refreshes(names):
+    for name in names:
+        threading.Thread(target=_background_refresh, args=(name,), name=f"refresh-{name}", daemon=True).start()
+
+
+def _tick_loop():
+    while True:
+        time.sleep(TICK_SECONDS)
+        now = time.time()
+        with _lock:
+            due = [name for name, e in _datasets.items() if _is_due(e, now)]
+            for name in due:
+                _datasets[name]["refreshing"] = True
+        _start_refreshes(due)
+
+
+def _ensure_ticker():
+    global _ticker
+    with _lock:
+        if _ticker is None or not _ticker.is_alive():
+            _ticker = threading.Thread(target=_tick_loop, name="refresh-scheduler", daemon=True)
+            _ticker.start()
+
+
+def get(name):
+    """
+    Last good value of a dataset. Only blocks when there is none yet (first load,
+    coalesced across sessions); raises if that first build fails, and keeps raising
+    that error for FAILURE_COOLDOWN seconds before the build is tried again.
+    """
+    entry = _datasets[name]
+    now = time.time()
+    entry["last_access"] = now
+    if not entry["has_value"]:
+        if entry["failure"] is not None and now - entry["failed_at"] < FAILURE_COOLDOWN:
+            raise entry["failure"]
+        try:
+            single_flight.do("refresh", name, _refresh, name)
+        except Exception as e:
+            entry.update(failure=e, failed_at=time.time(), error=str(e))
+            raise
+        entry.update(failure=None, failed_at=0)
+        return entry["value"]
+
+    # Stale and not refreshed while nobody was reading: revalidate in the background now
+    with _lock:
+        due = _is_due(entry, now)
+        if due:
+            entry["refreshing"] = True
+    if due:
+        _start_refreshes([name])
+    return entry["value"]
+
+
+def get_with_version(name):
+    """(value, version) of the value currently served."""
+    value = get(name)
+    return value, _datasets[name]["version"]
+
+
+def data_as_of(name):
+    """Timestamp (epoch seconds) the served data was last confirmed current, or None."""
+    entry = _datasets.get(name)
+    return entry["as_of"] if entry else None
+
+
+def as_of_label(name):
+    """'데이터 기준: 2024-05-01 14:03:12' for display, or '' if not loaded yet."""
+    ts = data_as_of(name)
+    if ts is None:
+        return ""
+    return f"데이터 기준: {datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')}"
+
+
+def status():
+    """Per-dataset state for display: {name: {"version", "as_of", "interval", "refreshing", "error"}}."""
+    with _lock:
+        return {
+            name: {k: e[k] for k in ("version", "as_of", "interval", "refreshing", "error")}
+            for name, e in _datasets.items()
+        }
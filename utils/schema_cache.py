@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import threading
+
+# Table metadata cache (column names + resolved name/date columns).
+# Replaces `SELECT * ... LIMIT 0` probe jobs: metadata is read once per table
+# with client.get_table() (no query job), persisted across restarts, and
+# revalidated against the table's `modified` timestamp after SCHEMA_MAX_AGE.
+SCHEMA_CACHE_FILE = os.path.join(".cache", "schemas.json")
+
+# Seconds a cached schema is trusted before it is revalidated
+SCHEMA_MAX_AGE = 3600
+
+DEFAULT_NAME_CANDIDATES = ['Name', 'Player Name', 'Player_Name', 'Player', '이름', '선수명']
+
+_entries = None
+_lock = threading.Lock()
+
+
+def _load_file():
+    global _entries
+    if _entries is None:
+        try:
+            with open(SCHEMA_CACHE_FILE, "r", encoding="utf-8") as f:
+                _entries = json.load(f)
+        except (OSError, ValueError):
+            _entries = {}
+    return _entries
+
+
+def _save_file():
+    try:
+        os.makedirs(os.path.dirname(SCHEMA_CACHE_FILE), exist_ok=True)
+        with open(SCHEMA_CACHE_FILE + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(_entries, f, ensure_ascii=False, indent=1)
+        os.replace(SCHEMA_CACHE_FILE + ".tmp", SCHEMA_CACHE_FILE)
+    except OSError as e:
+        print(f"Schema cache write failed: {e}")
+
+
+def resolve_name_column(columns, candidates=DEFAULT_NAME_CANDIDATES):
+    """First candidate present in `columns` (case insensitive), or None."""
+    cols_lower = {c.lower(): c for c in columns}
+    for nc in candidates:
+        if nc.lower() in cols_lower:
+            return cols_lower[nc.lower()]
+    return None
+
+
+def resolve_date_column(columns):
+    """Date Column (Test_Date vs Date): 'Date' / 'date' if present, else 'Test_Date'."""
+    if 'Date' in columns: return 'Date'
+    if 'date' in columns: return 'date'
+    return 'Test_Date'
+
+
+def _modified_ts(table):
+    return table.modified.timestamp() if table.modified else None
+
+
+def get_table_info(client, table_ref, name_candidates=DEFAULT_NAME_CANDIDATES):
+    """
+    Returns {'columns', 'name_col', 'date_col', 'modified', 'checked_at'} for a table.
+    Served from memory/disk; after SCHEMA_MAX_AGE the table metadata is re-read and
+    the entry is rebuilt only if the table was modified.
+    `name_col` is resolved with `name_candidates`.
+    """
+    with _lock:
+        entries = _load_file()
+        entry = entries.get(table_ref)
+
+    if entry is None or time.time() - entry.get("checked_at", 0) >= SCHEMA_MAX_AGE:
+        table = client.get_table(table_ref)  # metadata call, no query job
+        modified = _modified_ts(table)
+        if entry is None or entry.get("modified") != modified:
+            columns = [field.name for field in table.schema]
+            entry = {
+                "columns": columns,
+                "name_col": resolve_name_column(columns, name_candidates),
+                "name_candidates": list(name_candidates),
+                "date_col": resolve_date_column(columns),
+                "modified": modified,
+            }
+        entry = dict(entry, checked_at=time.time())
+        with _lock:
+            _entries[table_ref] = entry
+            _save_file()
+
+    if entry.get("name_candidates") != list(name_candidates):
+        # Different candidate list than the stored one: resolve from the cached columns (no I/O)
+        entry = dict(entry, name_col=resolve_name_column(entry["columns"], name_candidates))
+    return entry
+
+
+def invalidate(table_ref=None):
+    """Forgets a table's cached schema (e.g. after a query failed on a missing column)."""
+    with _lock:
+        entries = _load_file()
+        if table_ref is None:
+            entries.clear()
+        else:
+            entries.pop(table_ref, None)
+        _save_file()
@@ -0,0 +1,103 @@
+import functools
+import threading
+
+# Single-flight request coalescing for the loader functions.
+# When several sessions miss the cache for the same key at the same moment
+# (e.g. right after a data change), only the first caller runs the fetch;
+# the others wait for it and receive the same result instead of starting
+# identical BigQuery jobs. Results are shared objects - loaders already treat
+# their cached frames as read-only.
+# The decorator goes ABOVE @st.cache_*: Streamlit already serializes misses per
+# key behind its own lock, so a layer underneath never sees concurrent callers.
+# Above it, concurrent callers wait here and are counted.
+
+_inflight = {}  # key -> _Call
+_lock = threading.Lock()
+
+# name -> {"calls": calls that ran (cache lookup or fetch), "coalesced": concurrent duplicates that waited instead}
+_stats = {}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _count(name, field):
+    entry = _stats.setdefault(name, {"calls": 0, "coalesced": 0})
+    entry[field] += 1
+
+
+def do(name, key, fn, *args, **kwargs):
+    """
+    Runs fn(*args, **kwargs) unless a call with the same (name, key) is already
+    in flight, in which case it waits for that call and returns its result
+    (or re-raises its exception).
+    """
+    flight_key = (name, key)
+    with _lock:
+        call = _inflight.get(flight_key)
+        leader = call is None
+        if leader:
+            call = _Call()
+            _inflight[flight_key] = call
+            _count(name, "calls")
+        else:
+            _count(name, "coalesced")
+
+    if not leader:
+        print(f"[single-flight] {name}: waiting on in-flight fetch")
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = fn(*args, **kwargs)
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(flight_key, None)
+        call.done.set()
+
+
+def _make_key(args, kwargs):
+    key = (args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        return repr(key)
+
+
+def coalesce(fn):
+    """
+    Decorator form of do(), keyed by the function and its arguments.
+    Place it above @st.cache_* (see the module note); arguments must be hashable.
+    """
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return do(name, _make_key(args, kwargs), fn, *args, **kwargs)
+
+    if hasattr(fn, "clear"):
+        wrapper.clear = fn.clear  # st.cache_* entry point stays reachable
+    return wrapper
+
+
+def stats():
+    """Copy of the per-loader counters: {name: {"calls", "coalesced"}}."""
+    with _lock:
+        return {name: dict(entry) for name, entry in _stats.items()}
+
+
+def duplicates_avoided():
+    """Total number of fetches that were served by another caller's in-flight fetch."""
+    with _lock:
+        return sum(entry["coalesced"] for entry in _stats.values())
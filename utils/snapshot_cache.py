@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import pandas as pd
+from utils import bq_fetch
+
+# Local columnar snapshots of BigQuery tables (one Parquet file per table).
+# The manifest keeps a per-key digest (e.g. per Test_ID) so a refresh only
+# re-downloads the rows whose key was added or changed in the source sheet.
+# It is stored in the Parquet schema metadata, so data and manifest are replaced
+# together by one atomic rename, and each table's read-refresh-write cycle runs
+# under a per-table lock (column sets of one table are loaded concurrently).
+SNAPSHOT_DIR = os.path.join(".cache", "snapshots")
+
+# Seconds a snapshot is trusted before the per-key digests are re-checked
+SNAPSHOT_MAX_AGE = 600
+
+# Placeholder for NULL keys (JSON manifest keys must be strings)
+NULL_KEY = "__null__"
+
+# Server-side fingerprint of each source row. Stored with the snapshot so that
+# columns fetched later (column projection) can be joined back row-for-row.
+ROW_FP = "_row_fp"
+ROW_FP_SQL = "FARM_FINGERPRINT(TO_JSON_STRING(t))"
+
+# Parquet codec for snapshots (columnar + zstd keeps the files small)
+COMPRESSION = "zstd"
+
+# Bump when the on-disk layout changes; older snapshots are rebuilt
+SNAPSHOT_FORMAT = 3
+
+# Parquet schema metadata key holding the JSON manifest
+MANIFEST_KEY = b"snapshot_manifest"
+
+_table_locks = {}  # table_ref -> Lock
+_locks_guard = threading.Lock()
+
+
+def _table_lock(table_ref):
+    with _locks_guard:
+        return _table_locks.setdefault(table_ref, threading.Lock())
+
+
+def _snapshot_paths(table_ref):
+    """Returns (parquet_path, legacy_manifest_path) for a fully qualified table name."""
+    safe_name = table_ref.replace("`", "").replace(".", "__")
+    base = os.path.join(SNAPSHOT_DIR, safe_name)
+    return base + ".parquet", base + ".json"
+
+
+def _key_series(df, key_col):
+    """String view of the key column with NULLs mapped to NULL_KEY (matches the SQL side)."""
+    if key_col not in df.columns:
+        return pd.Series(NULL_KEY, index=df.index)
+    return df[key_col].astype("string").fillna(NULL_KEY).astype(str)
+
+
+def _sql_key(key_col):
+    return f"IFNULL(CAST(`{key_col}` AS STRING), '{NULL_KEY}')"
+
+
+def read_snapshot(table_ref):
+    """Reads the local snapshot. Returns (df, manifest) or (None, None) if missing/corrupt."""
+    import pyarrow.parquet as pq
+
+    parquet_path, _ = _snapshot_paths(table_ref)
+    if not os.path.exists(parquet_path):
+        return None, None
+    try:
+        table = pq.read_table(parquet_path)
+        raw = (table.schema.metadata or {}).get(MANIFEST_KEY)
+        if raw is None:
+            return None, None  # older layout (separate JSON manifest): rebuilt
+        manifest = json.loads(raw.decode("utf-8"))
+        df = table.replace_schema_metadata(None).to_pandas()
+        return df, manifest
+    except Exception as e:
+        print(f"Snapshot read failed for {table_ref}: {e}")
+        return None, None
+
+
+def write_snapshot(table_ref, df, manifest):
+    """
+    Atomically writes data + manifest (one Parquet file, manifest in the schema metadata;
+    tmp file + rename) so readers never see a half-written or mismatched pair.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet_path, legacy_manifest_path = _snapshot_paths(table_ref)
+    tmp_path = f"{parquet_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[MANIFEST_KEY] = json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+        pq.write_table(table.replace_schema_metadata(metadata), tmp_path, compression=COMPRESSION)
+        os.replace(tmp_path, parquet_path)
+        if os.path.exists(legacy_manifest_path):
+            os.remove(legacy_manifest_path)
+    except Exception as e:
+        print(f"Snapshot write failed for {table_ref}: {e}")
+
+
+def snapshot_version(manifest):
+    """Stable short hash of the per-key digests; changes whenever any key's rows change."""
+    if not manifest:
+        return None
+    payload = json.dumps(manifest.get("digests", {}), sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def fetch_key_digests(client, table_ref, key_col):
+    """
+    One aggregate job: row count + XOR of row fingerprints per key (small result, but
+    it scans the table). Any edited, added or deleted row changes the digest of its key.
+    Only reached when the snapshot is stale, i.e. the probed source version changed
+    (see utils.data_version) or max_age expired.
+    """
+    query = f"""
+        SELECT {_sql_key(key_col)} AS snap_key,
+               COUNT(*) AS n,
+               BIT_XOR({ROW_FP_SQL}) AS digest
+        FROM `{table_ref}` AS t
+        GROUP BY snap_key
+    """
+    rows = client.query(query).result()
+    return {row["snap_key"]: f"{row['n']}:{row['digest']}" for row in rows}
+
+
+def fetch_source_columns(client, table_ref):
+    """Column names of the source table (metadata call, no query job)."""
+    return [field.name for field in client.get_table(table_ref).schema]
+
+
+def _fetch_rows(client, table_ref, key_col, columns=None, keys=None):
+    """Downloads rows (all, or only those whose key is in `keys`) for the given columns plus ROW_FP."""
+    from google.cloud import bigquery
+
+    if columns is None:
+        select = f"{ROW_FP_SQL} AS {ROW_FP}, t.*"
+    else:
+        select = ", ".join([f"{ROW_FP_SQL} AS {ROW_FP}"] + [f"t.`{c}`" for c in columns])
+
+    if keys is None:
+        return bq_fetch.query_to_dataframe(client, f"SELECT {select} FROM `{table_ref}` AS t")
+
+    query = f"SELECT {select} FROM `{table_ref}` AS t WHERE {_sql_key(key_col)} IN UNNEST(@keys)"
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ArrayQueryParameter("keys", "STRING", sorted(keys))]
+    )
+    return bq_fetch.query_to_dataframe(client, query, job_config=job_config)
+
+
+def _missing_columns(requested, held, source_columns):
+    """Requested columns that exist in the source but are not in the snapshot yet."""
+    if held is None:
+        return []  # snapshot already holds every column
+    wanted = source_columns if requested is None else [c for c in requested if c in source_columns]
+    return [c for c in wanted if c not in held]
+
+
+def _project(df, columns, manifest=None):
+    """
+    Requested columns (without ROW_FP), tagged with the snapshot's data version in df.attrs.
+    Columns the source does not have are skipped; a source column missing from the
+    snapshot raises KeyError instead of returning (and caching) a short frame.
+    """
+    if columns is None:
+        out = df.drop(columns=[ROW_FP], errors="ignore")
+    else:
+        source_columns = set((manifest or {}).get("source_columns") or [])
+        lacking = [c for c in columns if c not in df.columns and c in source_columns]
+        if lacking:
+            raise KeyError(f"Snapshot lacks requested columns: {lacking}")
+        out = df[[c for c in columns if c in df.columns]]
+    out.attrs["data_version"] = snapshot_version(manifest)
+    return out
+
+
+def load_table(table_ref, client_factory, key_col="Test_ID", columns=None, max_age=SNAPSHOT_MAX_AGE,
+               source_version=None):
+    """
+    Returns the table as a DataFrame, served from the local snapshot when possible.
+
+    - Snapshot younger than `max_age`, or taken at the same `source_version`
+      (utils.data_version token, e.g. after a restart): returned as-is (no BigQuery job).
+    - Older snapshot: per-key digests are compared and only new/changed keys are
+      re-downloaded and merged; removed keys are dropped.
+    - No snapshot (or the source schema changed): full download, then persisted.
+    `columns` limits what is downloaded; columns requested later that the snapshot
+    does not hold yet are fetched on their own and joined on ROW_FP.
+    If BigQuery is unreachable, a stale snapshot is served instead of failing.
+    Concurrent loads of one table (e.g. different column sets) are serialized, so each
+    read-refresh-write cycle starts from the snapshot the previous one wrote.
+    """
+    with _table_lock(table_ref):
+        return _load_table_locked(table_ref, client_factory, key_col, columns, max_age, source_version)
+
+
+def _load_table_locked(table_ref, client_factory, key_col, columns, max_age, source_version):
+    df, manifest = read_snapshot(table_ref)
+    if manifest is not None and (manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("key") != key_col):
+        df, manifest = None, None
+
+    same_source = source_version is not None and manifest is not None and manifest.get("source_version") == source_version
+    if df is not None and (same_source or time.time() - manifest.get("checked_at", 0) < max_age):
+        if not _missing_columns(columns, manifest.get("columns"), manifest.get("source_columns", [])):
+            return _project(df, columns, manifest)
+
+    try:
+        client = client_factory()
+        source_columns = fetch_source_columns(client, table_ref)
+        digests = fetch_key_digests(client, table_ref, key_col)
+
+        if df is None or manifest.get("source_columns") != source_columns:
+            held = None if columns is None else [c for c in columns if c in source_columns]
+            if held is not None and key_col not in held:
+                held = [key_col] + held  # incremental refresh needs the key
+            df = _fetch_rows(client, table_ref, key_col, held)
+        else:
+            held = manifest.get("columns")
+            old_digests = manifest.get("digests", {})
+            changed = {k for k, v in digests.items() if old_digests.get(k) != v}
+            removed = {k for k in old_digests if k not in digests}
+
+            if changed or removed:
+                keys = _key_series(df, key_col)
+                kept = df[~keys.isin(changed | removed)]
+                if changed:
+                    fresh = _fetch_rows(client, table_ref, key_col, held, changed)
+                    kept = pd.concat([kept, fresh], ignore_index=True) if not kept.empty else fresh
+                df = kept.reset_index(drop=True)
+                print(f"Snapshot {table_ref}: refreshed {len(changed)} keys, dropped {len(removed)}")
+
+            # Lazily add columns a new view asked for
+            missing = _missing_columns(columns, held, source_columns)
+            if missing:
+                extra = _fetch_rows(client, table_ref, key_col, missing).drop_duplicates(ROW_FP)
+                df = df.merge(extra, on=ROW_FP, how="left")
+                held = held + missing
+
+        now = time.time()
+        changed_data = manifest is None or digests != manifest.get("digests")
+        new_manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "table": table_ref,
+            "key": key_col,
+            "columns": held,
+            "source_columns": source_columns,
+            "digests": digests,
+            "source_version": source_version,
+            "checked_at": now,
+            "updated_at": now if changed_data else manifest.get("updated_at", now),
+        }
+        write_snapshot(table_ref, df, new_manifest)
+        return _project(df, columns, new_manifest)
+
+    except Exception as e:
+        if df is not None:
+            print(f"Snapshot refresh failed for {table_ref}, serving stale snapshot: {e}")
+            return _project(df, columns, manifest)
+        raise
@@ -1,80 +1,52 @@
 
 import streamlit as st
-from google.cloud import bigquery
-from google.oauth2 import service_account
 import pandas as pd
-import datetime
 import re
-import os
-
-# Define SERVICE_ACCOUNT_FILE for BigQuery authentication
-SERVICE_ACCOUNT_FILE = "ycg-key.json"
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from utils import bq_fetch, bq_clients, schema_cache, data_version, single_flight, refresh_scheduler, player_cache, disk_cache, cache_namespaces, query_builder
 
 def get_client():
-    credentials = None
-    project_id = "ycgcenter" # Default
-    
-    # 1. Try Loading from Secrets (for Streamlit Cloud)
-    if "ycg_service_account" in st.secrets:
-        try:
-            scopes = ["https://www.googleapis.com/auth/cloud-platform", "https://www.googleapis.com/auth/drive"]
-            key_info = dict(st.secrets["ycg_service_account"])
-            credentials = service_account.Credentials.from_service_account_info(
-                key_info, scopes=scopes
-            )
-            project_id = credentials.project_id
-        except Exception as e:
-            print(f"Secret Load Error: {e}")
-            pass # Fallback to file
-
-    # 2. Try Loading from Local File (for Local Development)
-    if not credentials:
-        if os.path.exists(SERVICE_ACCOUNT_FILE):
-            try:
-                # FIXED: Must include Drive scope for External Tables
-                scopes = ["https://www.googleapis.com/auth/cloud-platform", "https://www.googleapis.com/auth/drive"]
-                credentials = service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=scopes)
-                project_id = credentials.project_id
-            except Exception as e:
-                 st.error(f"인증 파일 로드 실패: {e}")
-                 return None
-    
-    # If still no credentials, rely on default chain (but warn)
-    if not credentials:
-        pass
-
+    """Shared YCG client (built once per process, see utils.bq_clients). Returns None on failure."""
     try:
-        if credentials:
-            return bigquery.Client(credentials=credentials, project=project_id)
-        else:
-            return bigquery.Client(project="ycgcenter")
+        return bq_clients.get_client("ycg")
     except Exception as e:
         st.error(f"BigQuery 연결 실패: {e}")
         return None
 
-@st.cache_data(ttl=600)
-def load_vald_data(player_name):
+VALD_DATASET = "ycgcenter.YCGCenter_db"
+
+VALD_TABLES = {
+    "CMJ": "vald_cmj",
+    "Nordbord": "vald_nordbord",
+    "ForceFrame": "vald_forceframe", 
+    "SJ": "vald_sj",
+    "HJ": "vald_hj" 
+}
+
+# Potential Name Columns to check in order
+# FIXED: Prioritize 'Name' because we are searching by Name string. 
+NAME_COL_CANDIDATES = ['Name', 'Player Name', 'Player_Name', 'Player', '이름', '선수명', 'Player_ID']
+
+def get_data_version():
     """
-    Queries all 5 VALD tables for a specific player name.
-    Attempts exact match first, then fuzzy match (cleaned name), then substring match.
+    Combined source version of all VALD tables (rate-limited probe, see utils.data_version),
+    in the 'vald' cache namespace (see utils.cache_namespaces).
     """
-    client = get_client()
-    if not client: return {}
+    return cache_namespaces.key("vald", data_version.combined_version("ycg", [f"{VALD_DATASET}.{t}" for t in VALD_TABLES.values()]))
 
-    tables = {
-        "CMJ": "vald_cmj",
-        "Nordbord": "vald_nordbord",
-        "ForceFrame": "vald_forceframe", 
-        "SJ": "vald_sj",
-        "HJ": "vald_hj" 
-    }
-    
-    data_dict = {}
+# Byte budget for cached per-player results (see utils.player_cache)
+PLAYER_CACHE_BYTES = 128 * 1024 * 1024
+_player_cache = player_cache.PlayerLRU("vald", PLAYER_CACHE_BYTES)
 
-    # Define Name Cleaning Strategy
-    # Remove "(18)" or "(Num)" from start or end
-    # e.g. "(18)안 선우" -> "안 선우" -> trim -> "안선우"
-    
+# Rank sentinel for "no strategy matched"
+NO_MATCH = 99
+
+def name_candidates(player_name):
+    """
+    Search candidates in priority order.
+    e.g. "(18)안 선우" -> ["(18)안 선우", "안 선우", "안선우"]
+    """
     # 1. Exact Name
     candidates = [player_name]
     
@@ -87,133 +59,271 @@ def load_vald_data(player_name):
     nospace = cleaned.replace(" ", "")
     if nospace != cleaned:
         candidates.append(nospace)
-        
-    print(f"Searching VALD for candidates: {candidates}")
+    return candidates
 
-    # Potential Name Columns to check in order
-    # FIXED: Prioritize 'Name' because we are searching by Name string. 
-    name_col_candidates = ['Name', 'Player Name', 'Player_Name', 'Player', '이름', '선수명', 'Player_ID']
+def build_match_query(table_id, name_col, date_col, n_candidates):
+    """
+    One query per table replacing the old candidate x strategy cascade.
+    For candidate i the strategies rank as: exact = 3i, substring = 3i+1,
+    substring ignoring spaces = 3i+2. Each row gets its best (lowest) rank and
+    only the rows with the table-wide best rank are returned - the same rows
+    the sequential cascade would have stopped at.
+    Candidates are bound as @c{i} (raw) and @n{i} (spaces removed).
+    """
+    name_expr = f"CAST(`{name_col}` AS STRING)"
+    terms = []
+    for i in range(n_candidates):
+        terms.append(f"IF({name_expr} = @c{i}, {3 * i}, {NO_MATCH})")
+        terms.append(f"IF(@c{i} != '' AND STRPOS({name_expr}, @c{i}) > 0, {3 * i + 1}, {NO_MATCH})")
+        terms.append(f"IF(@n{i} != '' AND STRPOS(REPLACE({name_expr}, ' ', ''), @n{i}) > 0, {3 * i + 2}, {NO_MATCH})")
+    rank_expr = terms[0] if len(terms) == 1 else f"LEAST({', '.join(terms)})"
 
-    for test_name, table_id in tables.items():
-        found_df = pd.DataFrame()
-        
-        # 1. Determine the valid Name Column for this table
-        valid_name_col = None
-        try:
-            # Check schema efficiently
-            schema_q = f"SELECT * FROM `ycgcenter.YCGCenter_db.{table_id}` LIMIT 0"
-            schema_df = client.query(schema_q).to_dataframe()
-            user_cols = set(schema_df.columns)
-            
-            # Case insensitive check
-            user_cols_lower = {c.lower(): c for c in user_cols}
-            
-            for nc in name_col_candidates:
-                if nc.lower() in user_cols_lower:
-                    valid_name_col = user_cols_lower[nc.lower()]
-                    break
-            
-            # print(f"[{test_name}] Columns: {list(user_cols)}")    
-            if not valid_name_col:
-                print(f"[{test_name}] No matching Name column found.")
-                continue
-            else:
-                pass 
-                # print(f"[{test_name}] Selected Name Column: {valid_name_col}")
-                
-        except Exception as e:
-            print(f"[{test_name}] Schema check failed: {e}")
+    return f"""
+        SELECT * FROM (
+            SELECT t.*, {rank_expr} AS _match_rank
+            FROM `{VALD_DATASET}.{table_id}` AS t
+        )
+        WHERE _match_rank < {NO_MATCH}
+        QUALIFY _match_rank = MIN(_match_rank) OVER ()
+        ORDER BY `{date_col}` ASC
+    """
+
+def _load_vald_table(client, test_name, table_id, candidates):
+    """Cached schema lookup + single ranked match query for one VALD table. Returns a DataFrame (empty if no match)."""
+    from google.cloud import bigquery
+
+    table_ref = f"{VALD_DATASET}.{table_id}"
+
+    # 1. Name/Date columns from the schema cache (no LIMIT 0 probe job)
+    try:
+        info = schema_cache.get_table_info(client, table_ref, NAME_COL_CANDIDATES)
+    except Exception as e:
+        print(f"[{test_name}] Schema check failed: {e}")
+        return pd.DataFrame()
+
+    valid_name_col = info['name_col']
+    date_col = info['date_col']
+    if not valid_name_col:
+        print(f"[{test_name}] No matching Name column found.")
+        return pd.DataFrame()
+
+    # 2. One ranked query instead of up to 3 candidates x 3 strategies
+    params = []
+    for i, cand in enumerate(candidates):
+        params.append(bigquery.ScalarQueryParameter(f"c{i}", "STRING", cand))
+        params.append(bigquery.ScalarQueryParameter(f"n{i}", "STRING", cand.replace(" ", "")))
+    query = build_match_query(table_id, valid_name_col, date_col, len(candidates))
+    try:
+        df = bq_fetch.query_to_dataframe(client, query, job_config=bigquery.QueryJobConfig(query_parameters=params))
+    except Exception as e:
+        print(f"[{test_name}] Match query failed: {e}")
+        schema_cache.invalidate(table_ref)  # columns may have changed; re-read metadata next time
+        return pd.DataFrame()
+
+    if df.empty:
+        return pd.DataFrame()
+
+    rank = int(df['_match_rank'].iloc[0])
+    print(f"[{test_name}] Matched '{candidates[rank // 3]}' (strategy {rank % 3}), {len(df)} rows")
+    df = df.drop(columns=['_match_rank'])
+    if 'Test_Date' in df.columns:
+        df['Test_Date'] = pd.to_datetime(df['Test_Date'])
+    return df
+
+def normalize_name(name):
+    """
+    Normalized lookup key for a player name: NFC Hangul, "(18)"-style tags removed,
+    all whitespace removed, case-folded. "(18)안 선우" and "안선우" -> "안선우".
+    """
+    if name is None:
+        return ""
+    key = unicodedata.normalize("NFC", str(name))
+    key = re.sub(r'\(\d+\)', '', key)
+    return re.sub(r'\s+', '', key).casefold()
+
+def _fetch_full_vald_table(client, test_name, table_id):
+    """All rows of one VALD table (ordered by date) + its name column, or (None, None)."""
+    table_ref = f"{VALD_DATASET}.{table_id}"
+    try:
+        info = schema_cache.get_table_info(client, table_ref, NAME_COL_CANDIDATES)
+        if not info['name_col']:
+            print(f"[{test_name}] No matching Name column found.")
+            return None, None
+        df = query_builder.run(client, table_ref, order_by=[info['date_col']])
+        if 'Test_Date' in df.columns:
+            df['Test_Date'] = pd.to_datetime(df['Test_Date'])
+        return df, info['name_col']
+    except Exception as e:
+        print(f"[{test_name}] Full table load failed: {e}")
+        schema_cache.invalidate(table_ref)
+        return None, None
+
+def _fetch_vald_tables():
+    """
+    {test: (df, name_col)} for every VALD table that loaded, fetched concurrently.
+    Tables that fail or have no name column are skipped; raises only if none loaded.
+    """
+    client = get_client()
+    if not client:
+        raise RuntimeError("YCG BigQuery client unavailable")
+
+    with ThreadPoolExecutor(max_workers=len(VALD_TABLES)) as pool:
+        futures = {
+            test_name: pool.submit(_fetch_full_vald_table, client, test_name, table_id)
+            for test_name, table_id in VALD_TABLES.items()
+        }
+        loaded = {test_name: f.result() for test_name, f in futures.items()}
+
+    failed = [test_name for test_name, (df, _) in loaded.items() if df is None]
+    if len(failed) == len(loaded):
+        raise RuntimeError("No VALD table could be loaded")
+    if failed:
+        print(f"VALD tables skipped (failed to load): {failed}")
+    return {test_name: result for test_name, result in loaded.items() if result[0] is not None}
+
+@single_flight.coalesce
+@st.cache_resource(max_entries=2)
+def get_name_index(version=None):
+    """
+    Loads every VALD table once and indexes it by normalize_name(name):
+        {"tables": {test: df}, "keys": {key: {"names": {canonical names}, "rows": {test: positions}}}}
+    Tables that could not be loaded are skipped (empty frame, no keys), as the per-table
+    queries did; raises RuntimeError only if none loaded (callers fall back to queries).
+    Shared across sessions - treat the frames as read-only.
+    Rebuilt when `version` (get_data_version) changes; the raw tables are persisted per
+    version (utils.disk_cache), so after a restart the index is rebuilt from disk.
+    """
+    frames, meta = disk_cache.load_frames("vald_tables", version)
+    if frames is not None and set(frames) == set(VALD_TABLES):
+        loaded = {test_name: (frames[test_name], meta["name_cols"][test_name]) for test_name in VALD_TABLES}
+    else:
+        loaded = _fetch_vald_tables()
+        if set(loaded) == set(VALD_TABLES):
+            # Only complete sets are persisted, so skipped tables are retried after a restart
+            disk_cache.save_frames(
+                "vald_tables", version,
+                {test_name: df for test_name, (df, _) in loaded.items()},
+                meta={"name_cols": {test_name: name_col for test_name, (_, name_col) in loaded.items()}},
+            )
+
+    tables = {test_name: pd.DataFrame() for test_name in VALD_TABLES}
+    keys = {}
+    for test_name, (df, name_col) in loaded.items():
+        tables[test_name] = df
+        if df.empty:
             continue
+        names = df[name_col].astype(object)
+        norm = names.map(normalize_name)
+        # key -> positional row indices in this table (vectorized group-by)
+        for key, positions in norm.groupby(norm, sort=False).indices.items():
+            if not key:
+                continue
+            entry = keys.setdefault(key, {"names": set(), "rows": {}})
+            entry["rows"][test_name] = positions
+            entry["names"].update(str(n) for n in names.iloc[positions].unique())
+    return {"tables": tables, "keys": keys}
 
-        # 2. Query using the found valid column
-        # Determine Date Column dynamically (Test_Date vs Date)
-        date_col = 'Test_Date'
-        if 'Date' in user_cols: date_col = 'Date'
-        elif 'date' in user_cols: date_col = 'date'
-        
-        # Iteratively try querying until data found
-        for cand in candidates:
-            # Try Exact Match
-            query = f"""
-                SELECT *
-                FROM `ycgcenter.YCGCenter_db.{table_id}`
-                WHERE `{valid_name_col}` = '{cand}'
-                ORDER BY `{date_col}` ASC
-            """
-            try:
-                # print(f"   Querying: WHERE {valid_name_col} = '{cand}' ORDER BY {date_col}")
-                df = client.query(query).to_dataframe()
-                if not df.empty:
-                    found_df = df
-                    break # Found!
-            except Exception as e:
-                # print(f"   Query Failed: {e}")
-                pass
-            
-            # Try Like Match (if exact failed)
-            query_like = f"""
-                SELECT *
-                FROM `ycgcenter.YCGCenter_db.{table_id}`
-                WHERE `{valid_name_col}` LIKE '%{cand}%'
-                ORDER BY `{date_col}` ASC
-            """
-            try:
-                df_like = client.query(query_like).to_dataframe()
-                if not df_like.empty:
-                    found_df = df_like
-                    break
-            except Exception: pass
-            
-            # [NEW] Try Ignore-Space Match (Ultimate Fallback)
-            cand_nospace = cand.replace(" ", "")
-            if cand_nospace:
-                query_nospace = f"""
-                    SELECT *
-                    FROM `ycgcenter.YCGCenter_db.{table_id}`
-                    WHERE REPLACE(`{valid_name_col}`, ' ', '') LIKE '%{cand_nospace}%'
-                    ORDER BY `{date_col}` ASC
-                """
-                try:
-                    df_ns = client.query(query_nospace).to_dataframe()
-                    if not df_ns.empty:
-                        found_df = df_ns
-                        break
-                except Exception: pass
-            
-        if not found_df.empty:
-             if 'Test_Date' in found_df.columns:
-                found_df['Test_Date'] = pd.to_datetime(found_df['Test_Date'])
-             data_dict[test_name] = found_df
+# Served stale-while-revalidate: rebuilt in the background when the VALD tables change
+refresh_scheduler.register(
+    "vald",
+    build=lambda version, previous: get_name_index(version),
+    version=get_data_version,
+)
+
+def lookup_name(index, player_name):
+    """
+    Index entries for a name: the exact normalized key if present, otherwise every
+    key containing it (the old LIKE '%name%' behaviour). Returns a list of entries.
+    """
+    key = normalize_name(player_name)
+    if not key:
+        return []
+    if key in index["keys"]:
+        return [index["keys"][key]]
+    return [entry for k, entry in index["keys"].items() if key in k]
+
+def load_vald_data(player_name):
+    """
+    Returns {test_name: DataFrame} with all VALD rows of a player.
+    Cached per normalized name, so "(18)안 선우" and "안선우" share one entry,
+    and per index version, so edits show up without waiting for a ttl. Entries live in a
+    byte-budgeted LRU shared across sessions - treat the frames as read-only.
+    """
+    name_key = normalize_name(player_name)
+    try:
+        _, version = refresh_scheduler.get_with_version("vald")
+    except Exception as e:
+        print(f"VALD name index unavailable, querying tables: {e}")
+        # Raw name: the ranked query does its own exact / cleaned / substring matching
+        return _query_vald_data(player_name, get_data_version())
+    return _player_cache.get_or_load((name_key, version), _load_vald_data, name_key, version)
+
+@single_flight.coalesce
+def _load_vald_data(name_key, version=None):
+    # `version` only keys the cache; the index served right now belongs to it
+    index = refresh_scheduler.get("vald")
+
+    entries = lookup_name(index, name_key)
+    data_dict = {}
+    for test_name, df in index["tables"].items():
+        positions = [p for e in entries for p in e["rows"].get(test_name, [])]
+        if positions:
+            # Keep the table's date order (rows are stored sorted by date)
+            data_dict[test_name] = df.iloc[sorted(positions)].reset_index(drop=True)
         else:
-             data_dict[test_name] = pd.DataFrame() # Empty
-             
+            data_dict[test_name] = pd.DataFrame() # Empty
     return data_dict
 
+@single_flight.coalesce
 @st.cache_data(ttl=600)
+def _query_vald_data(player_name, version=None):
+    """
+    Fallback when the name index is unavailable: queries all 5 VALD tables.
+    Tables are queried concurrently; per table a single ranked query resolves
+    exact match -> cleaned name -> substring -> ignore-space match.
+    `version` (get_data_version) keys the cache like the index path; the ttl only
+    bounds entries cached while the version is unknown (None).
+    """
+    client = get_client()
+    if not client: return {}
+
+    candidates = name_candidates(player_name)
+    print(f"Searching VALD for candidates: {candidates}")
+
+    # The shared client is thread-safe; one worker per table => ~one round trip overall
+    with ThreadPoolExecutor(max_workers=len(VALD_TABLES)) as pool:
+        futures = {
+            test_name: pool.submit(_load_vald_table, client, test_name, table_id, candidates)
+            for test_name, table_id in VALD_TABLES.items()
+        }
+        data_dict = {test_name: f.result() for test_name, f in futures.items()}
+
+    return data_dict
+
 def get_vald_player_list():
     """
     Returns a list of unique player names found in the VALD CMJ table.
     """
+    return _get_vald_player_list(get_data_version())
+
+@single_flight.coalesce
+@st.cache_data(max_entries=4)
+def _get_vald_player_list(version=None):
     client = get_client()
     if not client: return []
     
     table_id = "vald_cmj"
     try:
-        # Determine Name column
-        schema_q = f"SELECT * FROM `ycgcenter.YCGCenter_db.{table_id}` LIMIT 0"
-        schema_df = client.query(schema_q).to_dataframe()
-        user_cols = {c.lower(): c for c in schema_df.columns}
-        
-        valid_name_col = None
-        for nc in ['Name', 'Player Name', 'Player_Name', 'Player', '이름', '선수명']:
-            if nc.lower() in user_cols:
-                valid_name_col = user_cols[nc.lower()]
-                break
+        # Determine Name column (schema cache, no probe job)
+        info = schema_cache.get_table_info(client, f"{VALD_DATASET}.{table_id}", schema_cache.DEFAULT_NAME_CANDIDATES)
+        valid_name_col = info['name_col']
         
         if not valid_name_col: return []
 
-        query = f"SELECT DISTINCT `{valid_name_col}` FROM `ycgcenter.YCGCenter_db.{table_id}` ORDER BY `{valid_name_col}`"
-        df = client.query(query).to_dataframe()
+        df = query_builder.run(
+            client, f"{VALD_DATASET}.{table_id}",
+            columns=[valid_name_col], distinct=True, order_by=[valid_name_col]
+        )
         return df[valid_name_col].tolist()
         
     except Exception as e:
@@ -0,0 +1,204 @@
+import sys
+import os
+import datetime
+import numpy as np
+import pandas as pd
+
+# Checks the precomputed engines against plain pandas references on synthetic data
+# (no BigQuery / credentials needed): SQL builder parameter binding and quoting,
+# range aggregates, incremental baselines, percentile ranks, the growth engine and
+# the per-player LRU.
+#   python verify_engines.py      -> exit code 1 if a check fails
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils import query_builder, growth_engine, player_cache
+from gangwon_fc.utils import gangwon_data_loader as gangwon
+from gangwon_fc.utils import range_aggregates, baselines, percentile_ranks, derived_metrics
+
+
+def _team_frame(seed, n=1500, players=25):
+    """Synthetic raw vald_all_data rows, prepared like the Gangwon team store."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Date": pd.to_datetime("2023-01-01") + pd.to_timedelta(rng.integers(0, 600, n), unit="D"),
+        "Name": rng.choice([f"p{i}" for i in range(players)], n),
+        "CMJ_Height_Imp_mom": rng.normal(40, 5, n),
+        "SLJ_Height_L": rng.normal(20, 3, n),
+        "SLJ_Height_R": rng.normal(20, 3, n),
+        "HipAdd_L": rng.normal(300, 20, n),
+        "HipAdd_R": rng.normal(300, 20, n),
+        "Position": rng.choice(["DF", "MF", "FW"], n),
+        "Age": rng.integers(18, 34, n),
+    })
+    df.loc[rng.random(n) < 0.2, "CMJ_Height_Imp_mom"] = np.nan
+    df.loc[:4, "Date"] = pd.NaT
+    return df
+
+
+def _prepare(raw):
+    return derived_metrics.add_to(gangwon.index_by_date(gangwon.normalize_columns(raw.copy())))
+
+
+def check_query_builder():
+    sql, params = query_builder.build_select(
+        "proj.ds.tbl",
+        columns=["Player Name"],
+        filters={"Team": "Gangwon'; DROP TABLE x --", "Test_ID": ["24_2", "24_1"],
+                 "Age": query_builder.Between(10, None), "Player": query_builder.Contains("Kim")},
+        order_by=[("Player Name", "DESC")], limit=5,
+    )
+    # Values are bound as parameters, never formatted into the SQL text
+    assert "DROP" not in sql and "24_1" not in sql and "Kim" not in sql, sql
+    assert "`Player Name`" in sql and sql.startswith("SELECT `Player Name` FROM `proj.ds.tbl`"), sql
+    bound = {name: (kind, type_, value) for kind, name, type_, value in params}
+    assert ("scalar", "STRING", "Gangwon'; DROP TABLE x --") in bound.values(), bound
+    assert ("array", "STRING", ["24_1", "24_2"]) in bound.values(), bound
+    assert ("scalar", "INT64", 10) in bound.values(), bound
+    for name in bound:
+        assert f"@{name}" in sql, (name, sql)
+    # Dict order does not change the query (cache keys stay stable)
+    assert query_builder.build_select("proj.ds.tbl", filters={"b": 1, "a": [2, 1]}) == \
+        query_builder.build_select("proj.ds.tbl", filters={"a": [1, 2], "b": 1})
+    for bad in (lambda: query_builder.quote_ident("a`; DROP"),
+                lambda: query_builder.quote_table("proj.ds.tbl`; --"),
+                lambda: query_builder.build_select("proj.ds.tbl", aggregates={"x": ("EVAL", "y")}),
+                lambda: query_builder.build_select("proj.ds.tbl", order_by=[("a", "SIDEWAYS")])):
+        try:
+            bad()
+        except ValueError:
+            continue
+        raise AssertionError("invalid identifier / spec was accepted")
+
+
+def check_range_aggregates():
+    df = _prepare(_team_frame(0))
+    aggs = range_aggregates.RangeAggregates(df, groups=df.groupby('Name').indices)
+    ranges = [(datetime.date(2023, 3, 1), datetime.date(2024, 1, 1)),
+              (datetime.date(2020, 1, 1), datetime.date(2030, 1, 1)),
+              (datetime.date(2023, 5, 5), datetime.date(2023, 5, 5)),
+              (datetime.date(2030, 1, 1), datetime.date(2031, 1, 1))]
+    for start, end in ranges:
+        view = df[(df['Test_Date'] >= pd.Timestamp(start)) & (df['Test_Date'] <= pd.Timestamp(end))]
+        assert len(gangwon.date_range_view(df, start, end)) == len(view), (start, end)
+        for m in ("CMJ_Height_Imp_mom", "SLJ_Avg"):
+            expected, got = view[m].mean(), aggs.mean(m, start, end)
+            assert (np.isnan(expected) and np.isnan(got)) or abs(expected - got) < 1e-9, (m, start, expected, got)
+            assert aggs.count(m, start, end) == view[m].count(), (m, start)
+            pd.testing.assert_frame_equal(
+                view.groupby('Name')[m].mean().reset_index(),
+                aggs.group_means(m, start, end).reset_index(drop=True),
+                check_dtype=False)
+
+
+def check_baselines():
+    raw = _team_frame(1)
+    full = _prepare(raw)
+    old = _prepare(raw[raw['Date'] < pd.Timestamp("2024-03-01")])
+    metrics = gangwon.baseline_metrics(full)
+
+    incremental = baselines.BaselineTable.build(old, metrics).updated(full)
+    rebuilt = baselines.BaselineTable.build(full, metrics)
+    assert incremental.watermark == rebuilt.watermark and incremental.fingerprint == rebuilt.fingerprint
+    for attr in ("n", "mean", "m2", "latest", "z"):
+        pd.testing.assert_frame_equal(getattr(incremental, attr), getattr(rebuilt, attr),
+                                      check_exact=False, rtol=1e-9, check_dtype=False)
+
+    # pandas reference: (latest - mean) / sample std per player
+    m = "CMJ_Height_Imp_mom"
+    dated = full[full['Test_Date'].notna()]
+    stats = dated.groupby('Name')[m].agg(['mean', 'std'])
+    latest = dated.dropna(subset=[m]).groupby('Name')[m].last()
+    expected = (latest - stats['mean']) / stats['std']
+    assert np.allclose(expected.sort_index(), incremental.z[m].sort_index(), equal_nan=True)
+
+    # Unchanged frame: same table; edited history: full rebuild
+    assert incremental.updated(full) is incremental
+    edited = full.copy()
+    edited.iloc[0, edited.columns.get_loc(m)] = 99.0
+    assert incremental.updated(edited).fingerprint != incremental.fingerprint
+
+
+def check_percentile_ranks():
+    df = _prepare(_team_frame(2))
+    index = percentile_ranks.PercentileIndex(df)
+    assert index.available_groups() == ['squad', 'position', 'age_band'], index.available_groups()
+    latest = df.groupby('Name')[index.metrics["Power"]].last()
+    positions = df.groupby('Name')['Position'].last()
+    # pandas reference: average rank, ties counted half
+    squad = (latest.rank(method='average') - 0.5) / latest.count() * 100
+    for player in latest.index:
+        assert abs(index.percentile(player, "Power") - squad[player]) < 1e-9, player
+        peers = latest[positions == positions[player]]
+        expected = (peers.rank(method='average')[player] - 0.5) / peers.count() * 100
+        assert abs(index.percentile(player, "Power", group='position') - expected) < 1e-9, player
+    assert np.isnan(index.percentile("nobody", "Power"))
+
+
+def check_growth_engine():
+    rng = np.random.default_rng(3)
+    rows = []
+    for p in range(200):
+        age0 = rng.uniform(11, 13)
+        for k in range(rng.integers(1, 6)):
+            age = age0 + k * rng.uniform(0.3, 1.2)
+            rows.append((f"P{p}", age, 140 + 8 * (age - 11) + rng.normal(0, 1), 40 + 4 * (age - 11)))
+    df = pd.DataFrame(rows, columns=["Player", "Age", "Height", "Weight"]).sample(frac=1, random_state=0)
+
+    # pandas reference: per-player loop (the maturity tab before the growth engine)
+    hist = df.sort_values(['Player', 'Age'])
+    parts = []
+    for player, p_df in hist.groupby('Player'):
+        p_df = p_df.assign(dh=p_df['Height'].diff(), da=p_df['Age'].diff())
+        p_df = p_df[p_df['da'] > 0].assign(v=lambda d: d['dh'] / d['da'])
+        parts.append(p_df[(p_df['v'] > 0) & (p_df['v'] < 20) & (p_df['da'] > 0.5)])
+    ref = pd.concat(parts)
+    curve = ref.assign(r=(ref['Age'] * 2).round() / 2).groupby('r')['v'].mean()
+    peaks = ref.loc[ref.groupby('Player')['v'].idxmax()]
+
+    growth = growth_engine.compute_growth(df)
+    got = growth_engine.velocity_curve(growth)
+    assert np.allclose(curve.index, got['Age_Rounded']) and np.allclose(curve.values, got['Velocity'])
+    phv = growth["phv"].set_index('Player')
+    assert list(phv.index) == list(peaks['Player'])
+    assert np.allclose(phv['PHV_Velocity'], peaks['v'])
+    assert np.allclose(phv['PHV_Age'], (peaks['Age'] - peaks['da'] / 2))
+
+
+def check_player_cache():
+    df = _prepare(_team_frame(4))
+    store = {"df": df, "players": {name: list(pos) for name, pos in df.groupby('Name').indices.items()}}
+    sizes = {name: player_cache.sizeof(gangwon._slice_player(store, pos)) for name, pos in store["players"].items()}
+    lru = player_cache.PlayerLRU("verify", max_bytes=int(max(sizes.values()) * 3))
+
+    for name, positions in store["players"].items():
+        got = lru.get_or_load((name, "v1"), gangwon._slice_player, store, positions)
+        expected = df[df['Name'] == name].reset_index(drop=True)
+        pd.testing.assert_frame_equal(got, expected)
+    stats = lru.stats()
+    assert stats["bytes"] <= stats["max_bytes"] and stats["evictions"] > 0, stats
+    assert stats["entries"] == len(store["players"]) - stats["evictions"], stats
+
+    # Most recent entry is a hit; the least recent one was evicted
+    last, first = list(store["players"])[-1], list(store["players"])[0]
+    lru.get_or_load((last, "v1"), gangwon._slice_player, store, store["players"][last])
+    assert lru.stats()["hits"] == 1
+    lru.get_or_load((first, "v1"), gangwon._slice_player, store, store["players"][first])
+    assert lru.stats()["misses"] == len(store["players"]) + 1
+
+
+CHECKS = [check_query_builder, check_range_aggregates, check_baselines,
+          check_percentile_ranks, check_growth_engine, check_player_cache]
+
+
+if __name__ == "__main__":
+    failed = False
+    for check in CHECKS:
+        name = check.__name__.replace("check_", "")
+        try:
+            check()
+            print(f"OK   {name}")
+        except Exception as e:
+            failed = True
+            print(f"FAIL {name}: {type(e).__name__}: {e}")
+    sys.exit(1 if failed else 0)
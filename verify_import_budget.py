@@ -0,0 +1,102 @@
+import sys
+import os
+import json
+import subprocess
+
+# Import-time budget for the login path and each page.
+# Every entry imports the modules its script loads at the top (before any data is
+# fetched) in a fresh interpreter, measures the wall time and checks that heavy
+# libraries stay unloaded where they are not needed. Entries with "start" then call
+# that function (the cache warm-up every script starts before its login gate) and
+# check it returns within "start_ms": its heavy imports run in the worker thread.
+#   python verify_import_budget.py      -> exit code 1 if a budget is exceeded
+
+# streamlit itself imports plotly.graph_objects, so plotly.express is the one we control
+HEAVY_MODULES = ["google.cloud.bigquery", "google.oauth2", "plotly.express", "scipy"]
+
+BUDGETS = {
+    # Home.py up to the login form: no pandas-heavy or BigQuery/plotly imports,
+    # and the warm-up it starts does not block the script
+    "login (Home.py)": {
+        "modules": ["streamlit", "utils.auth", "utils.single_flight", "utils.cache_warmup",
+                    "utils.refresh_scheduler", "utils.cache_namespaces"],
+        "budget_ms": 900,
+        "forbidden": HEAVY_MODULES + ["pandas"],
+        "start": "utils.cache_warmup.start",
+        "start_ms": 50,
+    },
+    # Login form of a page opened directly (pages/*.py): same constraints
+    "login (pages)": {
+        "modules": ["streamlit", "utils.auth", "utils.cache_warmup"],
+        "budget_ms": 900,
+        "forbidden": HEAVY_MODULES + ["pandas"],
+        "start": "utils.cache_warmup.start",
+        "start_ms": 50,
+    },
+    # Pages after login: data loaders + templates (BigQuery still loads on first query)
+    "page: K League": {
+        "modules": ["streamlit", "utils.auth", "utils.data_loader", "templates.template_association"],
+        "budget_ms": 2000,
+        "forbidden": ["google.cloud.bigquery", "google.oauth2", "scipy"],
+    },
+    "page: Yoon Center": {
+        "modules": ["streamlit", "utils.auth", "templates.template_center"],
+        "budget_ms": 2000,
+        "forbidden": ["google.cloud.bigquery", "google.oauth2", "scipy"],
+    },
+    "page: Gangwon FC": {
+        "modules": ["streamlit", "utils.auth", "gangwon_fc.utils.gangwon_data_loader", "plotly.express"],
+        "budget_ms": 2000,
+        "forbidden": ["google.cloud.bigquery", "google.oauth2", "scipy"],
+    },
+}
+
+_PROBE = """
+import os, sys, time, json, importlib
+sys.path.insert(0, {root!r})
+modules, heavy, start_fn = {modules!r}, {heavy!r}, {start_fn!r}
+start = time.perf_counter()
+for m in modules:
+    importlib.import_module(m)
+elapsed = (time.perf_counter() - start) * 1000
+loaded = [h for h in heavy if h in sys.modules]
+start_ms = None
+if start_fn:
+    module, name = start_fn.rsplit(".", 1)
+    fn = getattr(importlib.import_module(module), name)
+    start = time.perf_counter()
+    fn()
+    start_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": loaded, "start_ms": start_ms}}))
+sys.stdout.flush()
+os._exit(0)  # don't wait on / tear down a warm-up thread mid-import
+"""
+
+
+def measure(modules, heavy, start_fn=None):
+    code = _PROBE.format(root=os.getcwd(), modules=modules, heavy=heavy, start_fn=start_fn)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    failed = False
+    for name, conf in BUDGETS.items():
+        try:
+            result = measure(conf["modules"], conf["forbidden"], conf.get("start"))
+        except subprocess.CalledProcessError as e:
+            print(f"ERROR  {name}: import failed\n{e.stderr}")
+            failed = True
+            continue
+
+        over = result["ms"] > conf["budget_ms"]
+        blocking = result["start_ms"] is not None and result["start_ms"] > conf["start_ms"]
+        bad = over or blocking or bool(result["loaded"])
+        failed = failed or bad
+        status = "FAIL " if bad else "OK   "
+        print(f"{status}{name}: {result['ms']:.0f} ms (budget {conf['budget_ms']} ms)")
+        if result["loaded"]:
+            print(f"      heavy modules loaded: {result['loaded']}")
+        if result["start_ms"] is not None:
+            print(f"      {conf['start']}(): {result['start_ms']:.1f} ms (budget {conf['start_ms']} ms)")
+    sys.exit(1 if failed else 0)